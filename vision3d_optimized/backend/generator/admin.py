@@ -1,18 +1,42 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR
+from django.db.models import Case, Value, When
 from .models import GenerationHistory, PerformanceMetrics
+from .search import fts_available, hash_prefix_query, search_prompt_ids
 
 
 @admin.register(GenerationHistory)
 class GenerationHistoryAdmin(admin.ModelAdmin):
-    list_display = ['prompt_preview', 'access_count', 'generation_time', 'created_at', 'last_accessed']
-    list_filter = ['created_at', 'last_accessed']
+    list_display = ['prompt_preview', 'access_count', 'generation_time', 'generator_version',
+                    'created_at', 'last_accessed']
+    list_filter = ['generator_version', 'created_at', 'last_accessed']
     search_fields = ['prompt', 'prompt_hash']
     readonly_fields = ['prompt_hash', 'created_at', 'last_accessed']
     ordering = ['-access_count', '-created_at']
     
+    # Admin search results are paginated, so cap the ranked match set
+    search_limit = 1000
+    
     def prompt_preview(self, obj):
         return obj.prompt[:50] + '...' if len(obj.prompt) > 50 else obj.prompt
     prompt_preview.short_description = 'Prompt'
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Use the FTS5 prompt index instead of LIKE scans when available."""
+        search_term = search_term.strip()
+        if not search_term or not fts_available():
+            return super().get_search_results(request, queryset, search_term)
+        ids = [pk for pk, _ in search_prompt_ids(search_term, self.search_limit)]
+        matches = queryset.filter(pk__in=ids)
+        by_hash = hash_prefix_query(search_term)
+        if by_hash is not None:
+            matches |= queryset.filter(by_hash)
+        if ids and not request.GET.get(ORDER_VAR):
+            # Best BM25 match first unless a column sort was picked; hash prefix
+            # matches come after the ranked ones
+            rank = Case(*[When(pk=pk, then=Value(i)) for i, pk in enumerate(ids)], default=Value(len(ids)))
+            matches = matches.order_by(rank.asc(), *queryset.query.order_by)
+        return matches, False
 
 
 @admin.register(PerformanceMetrics)
@@ -0,0 +1,137 @@
+"""
+Admission control for cache-miss generation.
+
+Generation is CPU-bound, so only ``GENERATION_MAX_CONCURRENT`` misses run at
+once and at most ``GENERATION_MAX_QUEUE`` more may wait for a slot. Anything
+beyond that is rejected immediately with a ``Retry-After`` hint instead of
+tying up a server thread, which keeps threads free for cached hits.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from . import metrics
+
+
+class AdmissionRejected(Exception):
+    """Raised when a generation cannot be admitted; carries a retry hint."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded FIFO wait queue.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max(int(max_concurrent), 1)
+        self.max_queue = max(int(max_queue), 0)
+        self.queue_timeout = queue_timeout
+        self.condition = threading.Condition()
+        self.active = 0
+        self.waiting = []
+
+        # Counters exposed through stats()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.avg_duration = 1.0
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up, from recent job times."""
+        backlog = len(self.waiting) + 1
+        return max(1, math.ceil(self.avg_duration * backlog / self.max_concurrent))
+
+    @contextmanager
+    def admit(self):
+        """Hold a generation slot for the duration of the block."""
+        with self.condition:
+            if self.active < self.max_concurrent and not self.waiting:
+                wait_time = 0.0
+            elif len(self.waiting) >= self.max_queue:
+                self.rejected += 1
+                metrics.inc('vision3d_admission_rejections', {'reason': 'queue_full'})
+                raise AdmissionRejected("Generation queue is full", self.retry_after())
+            else:
+                ticket = object()
+                self.waiting.append(ticket)
+                self._publish()
+                start = time.monotonic()
+                deadline = start + self.queue_timeout
+                try:
+                    while self.active >= self.max_concurrent or self.waiting[0] is not ticket:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timed_out += 1
+                            self.rejected += 1
+                            metrics.inc('vision3d_admission_rejections', {'reason': 'timeout'})
+                            raise AdmissionRejected(
+                                "Timed out waiting for a generation slot", self.retry_after()
+                            )
+                        self.condition.wait(remaining)
+                finally:
+                    self.waiting.remove(ticket)
+                    self.condition.notify_all()
+                wait_time = time.monotonic() - start
+
+            self.active += 1
+            self.admitted += 1
+            self.total_wait += wait_time
+            self.max_wait = max(self.max_wait, wait_time)
+            self._publish()
+        metrics.observe('vision3d_stage_duration_seconds', wait_time, {'stage': 'admission_wait'})
+
+        started = time.monotonic()
+        try:
+            yield wait_time
+        finally:
+            duration = time.monotonic() - started
+            with self.condition:
+                self.active -= 1
+                self.avg_duration = 0.8 * self.avg_duration + 0.2 * duration
+                self._publish()
+                self.condition.notify_all()
+
+    def _publish(self):
+        """Mirror queue depth and active jobs into the shared metrics."""
+        metrics.set_gauge('vision3d_generation_queue_depth', len(self.waiting))
+        metrics.set_gauge('vision3d_generation_active', self.active)
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth, rejections and wait time for this process."""
+        with self.condition:
+            return {
+                'active': self.active,
+                'queue_depth': len(self.waiting),
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_wait_seconds': self.total_wait / self.admitted if self.admitted else 0.0,
+                'max_wait_seconds': self.max_wait,
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide admission controller, creating it once."""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController(
+                max_concurrent=getattr(settings, 'GENERATION_MAX_CONCURRENT', 2),
+                max_queue=getattr(settings, 'GENERATION_MAX_QUEUE', 8),
+                queue_timeout=float(getattr(settings, 'GENERATION_QUEUE_TIMEOUT', 30)),
+            )
+        return _controller
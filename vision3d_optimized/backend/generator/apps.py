@@ -2,6 +2,13 @@ from django.apps import AppConfig
 
 
 class GeneratorConfig(AppConfig):
+    """
+    App config for the generator.
+    
+    Warm-up is not done in ready(), which also runs for every manage.py
+    command; serving processes call generator.warmup.warm_up() from the
+    WSGI/ASGI modules (or a server post-fork hook) instead.
+    """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'generator'
     verbose_name = 'Vision3D Generator'
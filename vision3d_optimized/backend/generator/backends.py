@@ -0,0 +1,386 @@
+"""
+Pluggable generator backends and the isolated worker pool that runs them.
+
+A backend turns a prompt into a ``trimesh.Trimesh``. Backends are looked up by
+registry name (or dotted class path) from the ``GENERATOR_BACKEND`` setting.
+Isolated backends run in a pool of pre-warmed worker processes with a
+wall-clock timeout, an RSS limit and the per-job memory budget (see
+generator.memory); when a job fails or goes over budget, generation falls
+back to ``GENERATOR_FALLBACK_BACKEND`` in-process.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import numpy as np
+import trimesh
+from django.conf import settings
+from django.utils.module_loading import import_string
+from . import metrics
+from .memory import (
+    MemoryBudgetExceeded, check_budget, get_memory_budget, get_memory_policy, measure_memory, read_rss_bytes,
+    record_usage,
+)
+from .shapes import SHAPES_VERSION, create_mesh_from_prompt, extract_color_from_prompt
+
+logger = logging.getLogger(__name__)
+
+class GenerationError(Exception):
+    """Raised when a backend job fails, times out or exceeds its memory limit."""
+
+
+_BACKENDS = {}
+
+
+def register_backend(cls):
+    """Class decorator adding a backend to the registry under ``cls.name``."""
+    _BACKENDS[cls.name] = cls
+    return cls
+
+
+def get_backend(name: str) -> 'GeneratorBackend':
+    """Instantiate a backend from its registry name or dotted class path."""
+    if name in _BACKENDS:
+        return _BACKENDS[name]()
+    if '.' in name:
+        return import_string(name)()
+    raise GenerationError(f"Unknown generator backend: {name}")
+
+
+def get_backend_version(name: str) -> str:
+    """Identify a backend and its output version, e.g. 'keyword-1'."""
+    backend = get_backend(name)
+    return f'{backend.name or type(backend).__name__}-{backend.version}'
+
+
+def get_generator_version() -> str:
+    """
+    Version of the configured backend.
+
+    Stored with every artifact; entries made under another version
+    (including fallback output) are stale.
+    """
+    return get_backend_version(getattr(settings, 'GENERATOR_BACKEND', 'keyword'))
+
+
+class GeneratorBackend:
+    """
+    Base class for text-to-mesh backends.
+
+    Subclasses set ``name`` and implement ``generate``, which returns a
+    Trimesh or a Scene of instanced parts. Backends that are slow,
+    memory-hungry or not fully trusted should keep ``isolated = True`` so
+    they run in the worker pool instead of the web process. ``version``
+    changes whenever the same prompt would produce a different model.
+    """
+    name = None
+    isolated = True
+    version = '1'
+
+    def warm_up(self):
+        """Load models and libraries before the first job."""
+        self.generate('warm up')
+
+    def generate(self, prompt: str) -> trimesh.Trimesh:
+        raise NotImplementedError
+
+
+@register_backend
+class KeywordBackend(GeneratorBackend):
+    """
+    Keyword matching over the built-in primitives.
+
+    Generation takes milliseconds, so it runs in-process and also serves as
+    the fallback for every other backend.
+    """
+    name = 'keyword'
+    isolated = False
+    version = str(SHAPES_VERSION)
+
+    def generate(self, prompt: str) -> trimesh.Trimesh:
+        return create_mesh_from_prompt(prompt)
+
+
+@register_backend
+class SlowFakeBackend(GeneratorBackend):
+    """
+    Deterministic stand-in for a heavy text-to-3D model.
+
+    Sleeps for ``GENERATOR_FAKE_DELAY`` seconds and holds
+    ``GENERATOR_FAKE_MEMORY_MB`` of ballast, so timeouts, memory limits and
+    capacity can be exercised on a CPU-only box.
+    """
+    name = 'slow_fake'
+
+    def warm_up(self):
+        pass
+
+    def generate(self, prompt: str) -> trimesh.Trimesh:
+        delay = float(getattr(settings, 'GENERATOR_FAKE_DELAY', 2.0))
+        memory_mb = int(getattr(settings, 'GENERATOR_FAKE_MEMORY_MB', 0))
+
+        # Touch every page so the ballast shows up in RSS
+        ballast = np.ones(memory_mb * 1024 * 1024 // 8) if memory_mb > 0 else None
+        time.sleep(delay)
+        del ballast
+
+        digest = hashlib.sha256(prompt.lower().strip().encode()).digest()
+        mesh = trimesh.creation.icosphere(subdivisions=1 + digest[0] % 3, radius=1.0)
+        mesh.visual.vertex_colors = extract_color_from_prompt(prompt.lower())
+        return mesh
+
+
+def _pack_mesh(mesh) -> tuple:
+    if isinstance(mesh, trimesh.Scene):
+        parts = {name: _pack_mesh(part) for name, part in mesh.geometry.items()}
+        nodes = [(node,) + tuple(mesh.graph[node]) for node in mesh.graph.nodes_geometry]
+        return 'scene', parts, nodes
+    return mesh.vertices, mesh.faces, mesh.visual.vertex_colors
+
+
+def _unpack_mesh(data: tuple):
+    if isinstance(data[0], str):
+        _, parts, nodes = data
+        scene = trimesh.Scene()
+        for node, matrix, name in nodes:
+            if name not in scene.geometry:
+                scene.add_geometry(_unpack_mesh(parts[name]), geom_name=name,
+                                   node_name=node, transform=matrix)
+            else:
+                scene.graph.update(frame_to=node, frame_from=scene.graph.base_frame,
+                                   matrix=matrix, geometry=name)
+        return scene
+    vertices, faces, colors = data
+    return trimesh.Trimesh(vertices=vertices, faces=faces, vertex_colors=colors, process=False)
+
+
+def _worker_main(backend_name: str, conn):
+    """Worker process loop: warm up once, then serve prompts until closed."""
+    backend = get_backend(backend_name)
+    backend.warm_up()
+    conn.send(('ready', None))
+    while True:
+        try:
+            prompt = conn.recv()
+        except EOFError:
+            break
+        if prompt is None:
+            break
+        try:
+            # One job at a time, so the traced peak is this job's alone
+            with measure_memory(trace=True) as usage:
+                mesh = backend.generate(prompt)
+            conn.send(('ok', (_pack_mesh(mesh), usage)))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    """Handle to one worker process and its pipe."""
+
+    def __init__(self, context, backend_name: str):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(backend_name, child_conn), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def _wait(self, deadline: float, max_rss: int, budget: int = 0, baseline: int = None):
+        """
+        Wait for a reply, killing the worker if it breaks a limit.
+
+        With a ``budget``, RSS growth over ``baseline`` beyond it stops the
+        job with MemoryBudgetExceeded before the memory is spent in full.
+        """
+        while not self.conn.poll(0.05):
+            error = None
+            rss = read_rss_bytes(self.process.pid)
+            if not self.process.is_alive():
+                error = "Worker process exited unexpectedly"
+            elif time.monotonic() > deadline:
+                error = "Generation timed out"
+            elif max_rss and rss is not None and rss > max_rss:
+                error = f"Worker exceeded memory limit ({rss // 2**20} MB)"
+            elif budget and baseline is not None and rss is not None and rss - baseline > budget:
+                self.kill()
+                usage = {'peak_traced_bytes': None, 'rss_delta_bytes': rss - baseline}
+                raise MemoryBudgetExceeded(
+                    f"Generation exceeded memory budget ({(rss - baseline) // 2**20} MB > "
+                    f"{budget // 2**20} MB)", usage
+                )
+            if error:
+                self.kill()
+                raise GenerationError(error)
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError):
+            # A dead worker's pipe polls as readable and then hits EOF
+            self.kill()
+            raise GenerationError("Worker process exited unexpectedly")
+
+    def run(self, prompt: str, timeout: float, max_rss: int, budget: int = 0) -> tuple:
+        """Return the generated mesh and the worker's memory usage for the job."""
+        if not self.ready:
+            self._wait(time.monotonic() + timeout, max_rss)
+            self.ready = True
+        baseline = read_rss_bytes(self.process.pid)
+        try:
+            self.conn.send(prompt)
+        except OSError:
+            self.kill()
+            raise GenerationError("Worker process exited unexpectedly")
+        status, payload = self._wait(time.monotonic() + timeout, max_rss, budget, baseline)
+        if status != 'ok':
+            raise GenerationError(payload)
+        packed, usage = payload
+        return _unpack_mesh(packed), usage
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    Fixed-size pool of pre-warmed worker processes for one backend.
+
+    A worker that times out, crashes, exceeds ``max_rss_mb`` or grows past
+    the memory budget is killed and replaced before it goes back to the
+    pool, so one bad job never poisons later ones.
+    """
+
+    def __init__(self, backend_name: str, size: int, timeout: float, max_rss_mb: int):
+        self.backend_name = backend_name
+        self.timeout = timeout
+        self.max_rss = max_rss_mb * 1024 * 1024 if max_rss_mb else 0
+        self.context = multiprocessing.get_context('spawn')
+        self.idle = queue.Queue()
+        for _ in range(size):
+            self.idle.put(_Worker(self.context, backend_name))
+
+    def _restart(self, worker: _Worker) -> _Worker:
+        """
+        Replace a dead worker. If the new process cannot be spawned the dead
+        handle is returned, so the pool keeps its size and retries on next use.
+        """
+        worker.kill()
+        metrics.inc('vision3d_worker_restarts', {'backend': self.backend_name})
+        try:
+            return _Worker(self.context, self.backend_name)
+        except Exception:
+            logger.exception("Could not restart generator worker for '%s'", self.backend_name)
+            return worker
+
+    def run(self, prompt: str) -> tuple:
+        try:
+            worker = self.idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise GenerationError("Timed out waiting for a free generator worker")
+        try:
+            if not worker.process.is_alive():
+                # Died while idle, or an earlier restart failed
+                worker = self._restart(worker)
+                if not worker.process.is_alive():
+                    raise GenerationError("Generator worker could not be started")
+            try:
+                return worker.run(prompt, self.timeout, self.max_rss, get_memory_budget())
+            finally:
+                if not worker.process.is_alive():
+                    worker = self._restart(worker)
+        finally:
+            self.idle.put(worker)
+
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def get_worker_pool(backend_name: str) -> WorkerPool:
+    """Return the process-wide worker pool for a backend, creating it once."""
+    global _pools_pid
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # Pools (and their pipes) created before a server fork belong to the parent
+            _pools.clear()
+            _pools_pid = os.getpid()
+        if backend_name not in _pools:
+            _pools[backend_name] = WorkerPool(
+                backend_name,
+                size=int(getattr(settings, 'GENERATOR_WORKERS', 2)),
+                timeout=float(getattr(settings, 'GENERATOR_TIMEOUT', 60)),
+                max_rss_mb=int(getattr(settings, 'GENERATOR_MAX_RSS_MB', 2048)),
+            )
+        return _pools[backend_name]
+
+
+def run_backend(backend_name: str, prompt: str) -> trimesh.Trimesh:
+    """
+    Run one generation job, in the worker pool if the backend is isolated.
+
+    Memory used by the job is recorded. Worker jobs over the memory budget
+    raise MemoryBudgetExceeded; in-process jobs only when they are traced
+    (``MEMORY_TRACE_IN_PROCESS``).
+    """
+    backend = get_backend(backend_name)
+    if backend.isolated and int(getattr(settings, 'GENERATOR_WORKERS', 2)) > 0:
+        mesh, usage = get_worker_pool(backend_name).run(prompt)
+        record_usage('generate', usage)
+        check_budget(usage)
+        return mesh
+    with measure_memory() as usage:
+        mesh = backend.generate(prompt)
+    record_usage('generate', usage)
+    if usage['peak_traced_bytes'] is not None:
+        check_budget(usage)
+    return mesh
+
+
+def generate_mesh(prompt: str) -> trimesh.Trimesh:
+    """
+    Generate a mesh with the configured backend.
+
+    Falls back to the fallback backend (keyword matching by default) when
+    the primary backend fails, times out or runs out of memory. A job over
+    the memory budget is rerouted the same way unless
+    ``GENERATION_MEMORY_POLICY`` is 'abort'. When the primary backend is the
+    fallback there is nothing to reroute to, so every error, including
+    MemoryBudgetExceeded, is raised as under 'abort'.
+
+    The result's ``metadata['generator_version']`` names the backend
+    version that actually produced it, so fallback output can be stored as
+    stale and regenerated later.
+    """
+    backend_name = getattr(settings, 'GENERATOR_BACKEND', 'keyword')
+    fallback_name = getattr(settings, 'GENERATOR_FALLBACK_BACKEND', 'keyword')
+    try:
+        mesh = run_backend(backend_name, prompt)
+        mesh.metadata['generator_version'] = get_backend_version(backend_name)
+        return mesh
+    except Exception as e:
+        metrics.inc('vision3d_generation_failures', {'backend': backend_name})
+        if isinstance(e, MemoryBudgetExceeded):
+            policy = get_memory_policy()
+            metrics.inc('vision3d_memory_budget_exceeded', {'backend': backend_name, 'policy': policy})
+            if policy == 'abort':
+                raise
+        if backend_name == fallback_name:
+            raise
+        logger.warning("Generator backend '%s' failed, falling back to '%s': %s", backend_name, fallback_name, e)
+    try:
+        # The fallback is the last resort, so it is measured but never rejected
+        with measure_memory() as usage:
+            mesh = get_backend(fallback_name).generate(prompt)
+        record_usage('generate', usage)
+        mesh.metadata['generator_version'] = get_backend_version(fallback_name)
+        return mesh
+    except Exception:
+        metrics.inc('vision3d_generation_failures', {'backend': fallback_name})
+        raise
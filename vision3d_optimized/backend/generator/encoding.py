@@ -0,0 +1,336 @@
+"""
+Compact GLB encoding for generated meshes.
+
+trimesh writes every mesh with per-vertex RGBA colors and uint32 indices.
+Generated models are a single color, so the compact encoder stores that color
+once as a PBR material, welds duplicate vertices, reorders triangles and
+vertices for the GPU vertex cache (see ``meshopt``) and narrows the index
+type to uint16 whenever the vertex count allows.
+
+Vertex normals are smoothed across edges flatter than a crease angle and
+split along sharper ones, so curved parts shade smoothly while boxes keep
+hard edges. By default they are stored as normalized int8
+(``KHR_mesh_quantization``, 4 bytes per vertex instead of 12).
+"""
+
+import json
+import os
+import struct
+import tempfile
+import numpy as np
+import trimesh
+from django.conf import settings
+from .meshopt import MAX_FACES, optimize_indices
+
+
+# glTF constants
+_GLB_MAGIC = 0x46546C67
+_CHUNK_JSON = 0x4E4F534A
+_CHUNK_BIN = 0x004E4942
+_BYTE = 5120
+_FLOAT = 5126
+_UNSIGNED_SHORT = 5123
+_UNSIGNED_INT = 5125
+_ARRAY_BUFFER = 34962
+_ELEMENT_ARRAY_BUFFER = 34963
+
+
+def get_glb_encoding() -> str:
+    """Return the configured GLB encoding mode ('compact' or 'trimesh')."""
+    return getattr(settings, 'GLB_ENCODING', 'compact')
+
+
+# Adjacent faces bent by less than this are shaded as one smooth surface
+_CREASE_ANGLE = np.radians(40.0)
+
+
+def get_normal_format() -> str:
+    """'int8' (quantized), 'float', or 'none' to leave normals to the viewer."""
+    return getattr(settings, 'GLB_NORMALS', 'int8')
+
+
+def quantize_normals(normals: np.ndarray) -> np.ndarray:
+    """Unit normals as normalized int8, padded to 4 bytes per vertex."""
+    packed = np.zeros((len(normals), 4), dtype='<i1')
+    packed[:, :3] = np.round(np.clip(normals, -1.0, 1.0) * 127)
+    return packed
+
+
+def split_normals(vertices: np.ndarray, faces: np.ndarray, crease_angle: float = _CREASE_ANGLE):
+    """
+    Crease-aware vertex normals for a position-welded mesh.
+
+    Each face corner averages the (area weighted) normals of the faces
+    around its vertex that are within ``crease_angle`` of its own face;
+    corners that end up with different normals become separate vertices.
+
+    Returns:
+        (vertices, normals, faces) with one vertex per distinct
+        (position, quantized normal) pair
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64)
+    triangles = vertices[faces]
+    cross = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(cross, axis=1)
+    unit = cross / np.where(lengths > 0, lengths, 1.0)[:, None]
+
+    # Pair every corner with every corner sharing its vertex, in one pass
+    corner_vertex = faces.ravel()
+    corner_face = np.repeat(np.arange(len(faces)), 3)
+    order = np.argsort(corner_vertex, kind='stable')
+    counts = np.bincount(corner_vertex, minlength=len(vertices))
+    group_len = counts[corner_vertex[order]]
+    group_start = (np.cumsum(counts) - counts)[corner_vertex[order]]
+    a = np.repeat(np.arange(len(order)), group_len)
+    b = group_start[a] + np.arange(len(a)) - np.repeat(np.cumsum(group_len) - group_len, group_len)
+    face_a, face_b = corner_face[order[a]], corner_face[order[b]]
+    smooth = np.einsum('ij,ij->i', unit[face_a], unit[face_b]) >= np.cos(crease_angle)
+
+    corner = order[a][smooth]
+    weights = cross[face_b[smooth]]
+    normals = np.stack([np.bincount(corner, weights=weights[:, k], minlength=len(corner_vertex))
+                        for k in range(3)], axis=1)
+    lengths = np.linalg.norm(normals, axis=1)
+    normals = np.where(lengths[:, None] > 0, normals / np.where(lengths > 0, lengths, 1.0)[:, None],
+                       unit[corner_face])
+
+    # Weld corners that share a position and (quantized) normal
+    keys = np.column_stack([corner_vertex, quantize_normals(normals)[:, :3].astype(np.int64)])
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    return vertices[corner_vertex[first]], normals[first], inverse.reshape(-1, 3)
+
+
+def _weld(mesh, optimize: bool, with_normals: bool):
+    """
+    Vertex, normal and face arrays with duplicates merged and, if enabled,
+    reordered; normals are None when not requested.
+    """
+    mesh.merge_vertices()
+    vertices, faces = np.asarray(mesh.vertices), np.asarray(mesh.faces)
+    normals = None
+    if with_normals and len(faces):
+        vertices, normals, faces = split_normals(vertices, faces)
+    if optimize:
+        # Reorder normals with their positions
+        attributes = vertices if normals is None else np.hstack([vertices, normals])
+        attributes, faces = optimize_indices(
+            attributes, faces, max_faces=int(getattr(settings, 'GLB_OPTIMIZE_MAX_FACES', MAX_FACES))
+        )
+        vertices = attributes[:, :3]
+        normals = None if normals is None else attributes[:, 3:]
+    return vertices, normals, faces
+
+
+def get_uniform_color(mesh):
+    """Return the RGBA color shared by every vertex, or None if it varies."""
+    visual = mesh.visual
+    if visual.kind == 'vertex':
+        colors = visual.vertex_colors
+    elif visual.kind == 'face':
+        colors = visual.face_colors
+    else:
+        return None
+    if len(colors) == 0 or not np.all(colors == colors[0]):
+        return None
+    return [int(c) for c in colors[0]]
+
+
+class GlbBuilder:
+    """
+    Minimal glTF 2.0 binary writer.
+
+    Accumulates buffer views, accessors, materials and meshes in a single
+    binary chunk, keeping every view 4-byte aligned as the spec requires.
+    """
+
+    def __init__(self):
+        self.gltf = {
+            'asset': {'version': '2.0', 'generator': 'vision3d'},
+            'scene': 0,
+            'scenes': [{'nodes': []}],
+            'nodes': [],
+            'meshes': [],
+            'accessors': [],
+            'bufferViews': [],
+        }
+        self.materials = []
+        self.extensions = set()
+        self.chunks = []
+        self.offset = 0
+
+    def _add_view(self, data: bytes, target: int, stride: int = None) -> int:
+        view = {
+            'buffer': 0,
+            'byteOffset': self.offset,
+            'byteLength': len(data),
+            'target': target,
+        }
+        if stride:
+            view['byteStride'] = stride
+        self.gltf['bufferViews'].append(view)
+        padding = (-len(data)) % 4
+        self.chunks.append(data + b'\x00' * padding)
+        self.offset += len(data) + padding
+        return len(self.gltf['bufferViews']) - 1
+
+    def _add_accessor(self, view: int, component_type: int, count: int,
+                      data_type: str, **bounds) -> int:
+        accessor = {
+            'bufferView': view,
+            'componentType': component_type,
+            'count': int(count),
+            'type': data_type,
+        }
+        accessor.update(bounds)
+        self.gltf['accessors'].append(accessor)
+        return len(self.gltf['accessors']) - 1
+
+    def add_material(self, color) -> int:
+        """Add a PBR material with the given RGBA (0-255) base color."""
+        base_color = [round(c / 255.0, 6) for c in color]
+        material = {'pbrMetallicRoughness': {'baseColorFactor': base_color}}
+        if base_color[3] < 1.0:
+            material['alphaMode'] = 'BLEND'
+        self.materials.append(material)
+        return len(self.materials) - 1
+
+    def add_mesh(self, vertices: np.ndarray, faces: np.ndarray, material: int = None,
+                 normals: np.ndarray = None, normal_format: str = 'int8') -> int:
+        """
+        Add an indexed triangle mesh, narrowing indices to uint16 if possible.
+
+        ``normals`` are written as float32 or, with ``normal_format='int8'``,
+        as normalized bytes under KHR_mesh_quantization.
+        """
+        vertices = np.ascontiguousarray(vertices, dtype='<f4')
+        if len(vertices) <= np.iinfo(np.uint16).max:
+            indices = np.ascontiguousarray(faces, dtype='<u2')
+            index_type = _UNSIGNED_SHORT
+        else:
+            indices = np.ascontiguousarray(faces, dtype='<u4')
+            index_type = _UNSIGNED_INT
+
+        position_view = self._add_view(vertices.tobytes(), _ARRAY_BUFFER)
+        position = self._add_accessor(
+            position_view, _FLOAT, len(vertices), 'VEC3',
+            min=vertices.min(axis=0).tolist(), max=vertices.max(axis=0).tolist(),
+        )
+        attributes = {'POSITION': position}
+        if normals is not None:
+            if normal_format == 'int8':
+                # Vertex attributes must be 4-byte aligned, so each normal is padded
+                normal_view = self._add_view(quantize_normals(normals).tobytes(), _ARRAY_BUFFER, stride=4)
+                attributes['NORMAL'] = self._add_accessor(normal_view, _BYTE, len(normals), 'VEC3',
+                                                          normalized=True)
+                self.extensions.add('KHR_mesh_quantization')
+            else:
+                normal_view = self._add_view(np.ascontiguousarray(normals, dtype='<f4').tobytes(),
+                                             _ARRAY_BUFFER)
+                attributes['NORMAL'] = self._add_accessor(normal_view, _FLOAT, len(normals), 'VEC3')
+        index_view = self._add_view(indices.tobytes(), _ELEMENT_ARRAY_BUFFER)
+        index = self._add_accessor(index_view, index_type, indices.size, 'SCALAR')
+
+        primitive = {'attributes': attributes, 'indices': index, 'mode': 4}
+        if material is not None:
+            primitive['material'] = material
+        self.gltf['meshes'].append({'primitives': [primitive]})
+        return len(self.gltf['meshes']) - 1
+
+    def add_node(self, mesh: int, matrix: np.ndarray = None) -> int:
+        """Add a root node instancing the given mesh."""
+        node = {'mesh': mesh}
+        if matrix is not None and not np.allclose(matrix, np.eye(4)):
+            # glTF matrices are column-major
+            node['matrix'] = np.asarray(matrix, dtype=np.float64).T.ravel().tolist()
+        self.gltf['nodes'].append(node)
+        self.gltf['scenes'][0]['nodes'].append(len(self.gltf['nodes']) - 1)
+        return len(self.gltf['nodes']) - 1
+
+    def to_bytes(self) -> bytes:
+        """Serialize the accumulated scene as a GLB container."""
+        gltf = dict(self.gltf)
+        if self.materials:
+            gltf['materials'] = self.materials
+        if self.extensions:
+            gltf['extensionsUsed'] = gltf['extensionsRequired'] = sorted(self.extensions)
+        binary = b''.join(self.chunks)
+        gltf['buffers'] = [{'byteLength': len(binary)}]
+
+        content = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+        content += b' ' * ((-len(content)) % 4)
+
+        length = 12 + 8 + len(content) + 8 + len(binary)
+        return b''.join([
+            struct.pack('<III', _GLB_MAGIC, 2, length),
+            struct.pack('<II', len(content), _CHUNK_JSON), content,
+            struct.pack('<II', len(binary), _CHUNK_BIN), binary,
+        ])
+
+
+def encode_compact_glb(mesh, optimize: bool = None) -> bytes:
+    """
+    Encode a single-color mesh or scene as a compact GLB.
+
+    Duplicate vertices are welded, index order is optimized for the vertex
+    cache and the color is stored as the base color of one material instead
+    of per-vertex RGBA. Scene parts are written once and referenced by one
+    node per instance. Returns None when the model is not a single color, so
+    callers can fall back to the trimesh exporter. ``optimize`` overrides
+    the GLB_OPTIMIZE_INDICES setting.
+    """
+    if optimize is None:
+        optimize = getattr(settings, 'GLB_OPTIMIZE_INDICES', True)
+    normal_format = get_normal_format()
+    with_normals = normal_format != 'none'
+    if isinstance(mesh, trimesh.Scene):
+        parts = mesh.geometry
+        nodes = [mesh.graph[node] for node in mesh.graph.nodes_geometry]
+    else:
+        parts = {None: mesh}
+        nodes = [(np.eye(4), None)]
+    colors = [get_uniform_color(part) for part in parts.values()]
+    if not colors or colors[0] is None or any(c != colors[0] for c in colors):
+        return None
+
+    # Parts used once are baked into one mesh; only repeated parts are worth
+    # the extra accessors and nodes of instancing
+    uses = {}
+    for _, name in nodes:
+        uses[name] = uses.get(name, 0) + 1
+    baked = [parts[name].copy().apply_transform(matrix) for matrix, name in nodes if uses[name] == 1]
+    instanced = [name for name in parts if uses.get(name, 0) > 1]
+
+    builder = GlbBuilder()
+    material = builder.add_material(colors[0])
+    if baked:
+        combined = trimesh.util.concatenate(baked) if len(baked) > 1 else baked[0]
+        vertices, normals, faces = _weld(combined, optimize, with_normals)
+        builder.add_node(builder.add_mesh(vertices, faces, material, normals, normal_format))
+    for name in instanced:
+        vertices, normals, faces = _weld(parts[name].copy(), optimize, with_normals)
+        index = builder.add_mesh(vertices, faces, material, normals, normal_format)
+        for matrix, node_name in nodes:
+            if node_name == name:
+                builder.add_node(index, matrix)
+    return builder.to_bytes()
+
+
+def export_glb(mesh, filepath) -> int:
+    """
+    Export a mesh or scene to a GLB file using the configured encoding.
+
+    The file is written under a temporary name and renamed into place, so a
+    concurrent existence check never sees a partial artifact.
+    Returns the number of bytes written.
+    """
+    data = None
+    if get_glb_encoding() == 'compact':
+        data = encode_compact_glb(mesh)
+    if data is None:
+        data = mesh.export(file_type='glb')
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filepath)), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, filepath)
+    return len(data)
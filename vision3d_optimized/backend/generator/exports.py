@@ -0,0 +1,195 @@
+"""
+Print-ready exports (binary STL, 3MF, OBJ) derived from stored artifacts.
+
+The writers work directly on the vertex and face arrays: STL is one
+structured NumPy array dumped with ``tobytes()``, and the text formats are
+rendered with a single ``%`` format per section instead of a per-face loop.
+
+Derived files are cached on disk next to the artifacts under ``derived/``,
+keyed by artifact, format and options, and concurrent requests for the same
+missing file share a single conversion.
+"""
+
+import io
+import os
+import tempfile
+import threading
+import zipfile
+from pathlib import Path
+import numpy as np
+from . import metrics
+
+
+_STL_DTYPE = np.dtype([
+    ('normal', '<f4', (3,)),
+    ('vertices', '<f4', (3, 3)),
+    ('attributes', '<u2'),
+])
+
+_3MF_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+    '</Types>'
+)
+_3MF_RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+    'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+    '</Relationships>'
+)
+
+
+def face_normals(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """Unit normals of each triangle (zero for degenerate faces)."""
+    triangles = vertices[faces]
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    lengths[lengths == 0] = 1.0
+    return normals / lengths[:, None]
+
+
+def write_stl(vertices: np.ndarray, faces: np.ndarray) -> bytes:
+    """Binary STL from vertex and face arrays."""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64)
+    records = np.zeros(len(faces), dtype=_STL_DTYPE)
+    records['normal'] = face_normals(vertices, faces)
+    records['vertices'] = vertices[faces]
+    header = b'vision3d binary STL'.ljust(80, b' ')
+    return header + np.uint32(len(faces)).tobytes() + records.tobytes()
+
+
+def write_obj(vertices: np.ndarray, faces: np.ndarray) -> bytes:
+    """Wavefront OBJ with shared vertices (1-based indices)."""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64) + 1
+    text = ('v %.6g %.6g %.6g\n' * len(vertices)) % tuple(vertices.ravel())
+    text += ('f %d %d %d\n' * len(faces)) % tuple(faces.ravel())
+    return ('# vision3d\n' + text).encode('ascii')
+
+
+def write_3mf(vertices: np.ndarray, faces: np.ndarray) -> bytes:
+    """3MF package (core spec, millimeter units) holding one mesh object."""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64)
+    model = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<model unit="millimeter" xml:lang="en-US" '
+        'xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">\n'
+        '<resources><object id="1" type="model"><mesh>\n<vertices>\n'
+        + ('<vertex x="%.6g" y="%.6g" z="%.6g"/>\n' * len(vertices)) % tuple(vertices.ravel())
+        + '</vertices>\n<triangles>\n'
+        + ('<triangle v1="%d" v2="%d" v3="%d"/>\n' * len(faces)) % tuple(faces.ravel())
+        + '</triangles>\n</mesh></object></resources>\n'
+        '<build><item objectid="1"/></build>\n</model>\n'
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', _3MF_CONTENT_TYPES)
+        package.writestr('_rels/.rels', _3MF_RELS)
+        package.writestr('3D/3dmodel.model', model)
+    return buffer.getvalue()
+
+
+# format -> (writer, content type)
+EXPORT_FORMATS = {
+    'stl': (write_stl, 'model/stl'),
+    '3mf': (write_3mf, 'model/3mf'),
+    'obj': (write_obj, 'model/obj'),
+}
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one execution.
+
+    The first caller runs the function; callers arriving while it runs wait
+    and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {'done': threading.Event()}
+        if not leader:
+            call['done'].wait()
+            if 'error' in call:
+                raise call['error']
+            return call['result']
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call['done'].set()
+
+
+_flights = SingleFlight()
+
+
+# Export scales are rounded to this many decimals, so every scale maps to
+# exactly one derived file and the file holds exactly that scale
+SCALE_DECIMALS = 4
+
+
+def normalize_scale(scale: float) -> float:
+    """Round an export scale to the precision used in derived file names."""
+    return round(float(scale), SCALE_DECIMALS)
+
+
+def get_derived_path(model_path: Path, fmt: str, scale: float = 1.0) -> Path:
+    """Cache location of a derived file; options are part of the name."""
+    model_path = Path(model_path)
+    scale = normalize_scale(scale)
+    suffix = '' if scale == 1.0 else '_x' + f'{scale:.{SCALE_DECIMALS}f}'.rstrip('0').rstrip('.')
+    return model_path.parent / 'derived' / f'{model_path.stem}{suffix}.{fmt}'
+
+
+def get_derived_artifact(model_path: Path, fmt: str, scale: float = 1.0) -> Path:
+    """
+    Return the path of ``model_path`` converted to ``fmt``, converting once.
+
+    Args:
+        model_path: Stored GLB artifact
+        fmt: One of EXPORT_FORMATS
+        scale: Uniform scale applied to the exported geometry, rounded to
+            SCALE_DECIMALS
+    """
+    scale = normalize_scale(scale)
+    derived_path = get_derived_path(model_path, fmt, scale)
+    if derived_path.exists():
+        metrics.inc('vision3d_cache_requests', {'tier': 'derived', 'result': 'hit'})
+        return derived_path
+    metrics.inc('vision3d_cache_requests', {'tier': 'derived', 'result': 'miss'})
+
+    def convert():
+        # A previous flight may have finished between the check and this call
+        if derived_path.exists():
+            return derived_path
+        import trimesh
+
+        writer = EXPORT_FORMATS[fmt][0]
+        with metrics.time_stage('convert'):
+            mesh = trimesh.load(str(model_path), force='mesh')
+            data = writer(np.asarray(mesh.vertices) * scale, mesh.faces)
+        derived_path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=derived_path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, derived_path)
+        return derived_path
+
+    return _flights.do(str(derived_path), convert)
@@ -0,0 +1,368 @@
+"""
+Approximate prompt matching with MinHash signatures and LSH banding.
+
+Prompts are reduced to word unigram and bigram shingles (minus a few stop
+words), hashed into a 64-row MinHash signature (one independently seeded
+64-bit hash per row), and indexed in 16 LSH bands of 4 rows. A lookup only
+compares the query against prompts that share at least one band, then
+ranks those candidates by estimated Jaccard similarity.
+
+Signatures keep the low 16 bits of each row minimum (b-bit MinHash),
+so four rows pack into one 64-bit band key and 1M prompts need ~260 MB.
+The index is rebuilt incrementally from ``GenerationHistory`` ids and
+persisted to ``PROMPT_INDEX_PATH`` (in the background every
+``PROMPT_INDEX_SAVE_INTERVAL`` seconds and at exit) so restarts only replay
+new rows.
+"""
+
+import atexit
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+import numpy as np
+from django.conf import settings
+
+
+NUM_PERM = 64
+ROWS_PER_BAND = 4
+NUM_BANDS = NUM_PERM // ROWS_PER_BAND
+
+# Merge pending entries into the sorted band arrays after this many adds
+_MERGE_THRESHOLD = 4096
+
+# Rows taken from any one band bucket per lookup; bounds the cost of
+# crowded buckets made of very common prompts
+_MAX_BUCKET_CANDIDATES = 256
+
+# Bumped whenever signatures change; persisted indexes of another version are rebuilt
+HASH_VERSION = 2
+
+# One seed per row; each row hashes a shingle with splitmix64(crc32 ^ seed), so
+# rows are independent (a linear map of crc32 would rank shingles identically)
+_SEEDS = np.random.RandomState(3).randint(0, 2**63, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_STOP_WORDS = frozenset(['a', 'an', 'the', 'of', 'with', 'and', 'in', 'on', 'for', 'to', 'my', 'some'])
+
+
+def shingles(prompt: str) -> set:
+    """Word unigrams and bigrams of a normalized prompt."""
+    tokens = [t for t in _TOKEN_RE.findall(prompt.lower()) if t not in _STOP_WORDS]
+    return set(tokens) | {f'{a} {b}' for a, b in zip(tokens, tokens[1:])}
+
+
+def minhash(prompt: str):
+    """Return the uint16 MinHash signature of a prompt, or None if it has no words."""
+    signatures, kept = minhash_many([prompt])
+    return signatures[0] if kept[0] else None
+
+
+def minhash_many(prompts: list, batch_size: int = 4096):
+    """
+    Signatures of many prompts with one vectorized pass per batch.
+
+    Returns (signatures, kept): uint16 rows for the prompts that have words
+    and a boolean mask of which prompts those are.
+    """
+    batches, kept = [], []
+    for start in range(0, len(prompts), batch_size):
+        items = [shingles(p) for p in prompts[start:start + batch_size]]
+        counts = np.fromiter((len(i) for i in items), dtype=np.int64, count=len(items))
+        kept.append(counts > 0)
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for i in items for s in i),
+                             dtype=np.uint64, count=int(counts.sum()))
+        if len(hashes):
+            offsets = np.cumsum(counts[counts > 0]) - counts[counts > 0]
+            rows = np.minimum.reduceat(_splitmix64(hashes[:, None] ^ _SEEDS), offsets, axis=0)
+            batches.append((rows & np.uint64(0xFFFF)).astype(np.uint16))
+    signatures = np.concatenate(batches) if batches else np.zeros((0, NUM_PERM), dtype=np.uint16)
+    return signatures, np.concatenate(kept) if kept else np.zeros(0, dtype=bool)
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer; uint64 arithmetic wraps, which the mix relies on."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _band_keys(signatures: np.ndarray) -> np.ndarray:
+    """Fold each band of 4 uint16 rows into one uint32 bucket key: (n, bands)."""
+    packed = np.ascontiguousarray(signatures).view(np.uint64)
+    return ((packed >> np.uint64(32)) ^ (packed & np.uint64(0xFFFFFFFF))).astype(np.uint32)
+
+
+class PromptIndex:
+    """
+    In-memory MinHash LSH index mapping prompts to history ids.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.signatures = np.zeros((0, NUM_PERM), dtype=np.uint16)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.sorted_keys = np.zeros((NUM_BANDS, 0), dtype=np.uint32)
+        self.sorted_rows = np.zeros((NUM_BANDS, 0), dtype=np.int32)
+        self.pending_signatures = []
+        self.pending_ids = []
+        self.pending_buckets = [{} for _ in range(NUM_BANDS)]
+        self.last_id = 0
+        self.last_sync = 0.0
+        self.saved_id = 0
+        self.last_save = time.monotonic()
+        self.saving = False
+
+    def __len__(self):
+        return len(self.ids) + len(self.pending_ids)
+
+    def add(self, history_id: int, prompt: str):
+        """Index one prompt under its history id."""
+        signature = minhash(prompt)
+        with self.lock:
+            self.last_id = max(self.last_id, int(history_id))
+            if signature is None:
+                return
+            row = len(self.ids) + len(self.pending_ids)
+            self.pending_signatures.append(signature)
+            self.pending_ids.append(int(history_id))
+            for band, key in enumerate(_band_keys(signature[None, :])[0]):
+                self.pending_buckets[band].setdefault(int(key), []).append(row)
+            if len(self.pending_ids) >= _MERGE_THRESHOLD:
+                self.merge()
+
+    def extend(self, history_ids: list, prompts: list):
+        """Index many prompts at once with a single re-sort of the bands."""
+        signatures, mask = minhash_many(list(prompts))
+        kept = [int(i) for i, keep in zip(history_ids, mask) if keep]
+        with self.lock:
+            if history_ids:
+                self.last_id = max(self.last_id, max(int(i) for i in history_ids))
+            self.pending_signatures.extend(signatures)
+            self.pending_ids.extend(kept)
+            self.merge()
+
+    def merge(self):
+        """
+        Fold pending entries into the sorted band arrays.
+
+        Only the pending keys are sorted; they are then inserted into each
+        band in one linear pass, after equal keys so rows stay in id order.
+        """
+        with self.lock:
+            if not self.pending_ids:
+                return
+            pending = np.array(self.pending_signatures)
+            first_row = len(self.ids)
+            keys = _band_keys(pending).T
+            order = np.argsort(keys, axis=1, kind='stable')
+            keys = np.take_along_axis(keys, order, axis=1)
+            rows = (order + first_row).astype(np.int32)
+            sorted_keys = np.empty((NUM_BANDS, first_row + len(pending)), dtype=np.uint32)
+            sorted_rows = np.empty_like(sorted_keys, dtype=np.int32)
+            for band in range(NUM_BANDS):
+                at = np.searchsorted(self.sorted_keys[band], keys[band], 'right')
+                sorted_keys[band] = np.insert(self.sorted_keys[band], at, keys[band])
+                sorted_rows[band] = np.insert(self.sorted_rows[band], at, rows[band])
+            self.sorted_keys, self.sorted_rows = sorted_keys, sorted_rows
+            self.signatures = np.vstack([self.signatures, pending])
+            self.ids = np.concatenate([self.ids, np.array(self.pending_ids, dtype=np.int64)])
+            self.pending_signatures = []
+            self.pending_ids = []
+            self.pending_buckets = [{} for _ in range(NUM_BANDS)]
+
+    def query(self, prompt: str, threshold: float):
+        """
+        Return ``(history_id, similarity)`` of the closest indexed prompt.
+
+        Returns None when nothing shares a band or the best estimated
+        Jaccard similarity is below ``threshold``.
+        """
+        signature = minhash(prompt)
+        if signature is None:
+            return None
+        keys = _band_keys(signature[None, :])[0]
+        with self.lock:
+            candidates = []
+            if len(self.ids):
+                lo = [np.searchsorted(self.sorted_keys[b], keys[b], 'left') for b in range(NUM_BANDS)]
+                hi = [np.searchsorted(self.sorted_keys[b], keys[b], 'right') for b in range(NUM_BANDS)]
+                for band in range(NUM_BANDS):
+                    if hi[band] > lo[band]:
+                        end = min(hi[band], lo[band] + _MAX_BUCKET_CANDIDATES)
+                        candidates.append(self.sorted_rows[band, lo[band]:end])
+            pending = set()
+            for band, key in enumerate(keys):
+                pending.update(self.pending_buckets[band].get(int(key), ()))
+            if pending:
+                candidates.append(np.fromiter(pending, dtype=np.int32))
+            if not candidates:
+                return None
+
+            rows = np.unique(np.concatenate(candidates))
+            merged = len(self.ids)
+            stacked = self.signatures[rows[rows < merged]]
+            ids = list(self.ids[rows[rows < merged]])
+            for row in rows[rows >= merged]:
+                stacked = np.vstack([stacked, self.pending_signatures[row - merged]])
+                ids.append(self.pending_ids[row - merged])
+
+            similarity = (stacked == signature).mean(axis=1)
+            best = int(np.argmax(similarity))
+            if similarity[best] < threshold:
+                return None
+            return int(ids[best]), float(similarity[best])
+
+    def save(self, path):
+        """
+        Persist the index atomically so other workers and restarts can load it.
+
+        Merged arrays are replaced rather than modified, so the snapshot is
+        written outside the lock and lookups are not blocked by the disk.
+        """
+        with self.lock:
+            self.merge()
+            snapshot = dict(
+                signatures=self.signatures, ids=self.ids,
+                sorted_keys=self.sorted_keys, sorted_rows=self.sorted_rows,
+                last_id=np.int64(self.last_id), hash_version=np.int64(HASH_VERSION),
+            )
+        directory = os.path.dirname(os.fspath(path)) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npz')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **snapshot)
+        os.replace(tmp_path, path)
+        self.saved_id = int(snapshot['last_id'])
+        self.last_save = time.monotonic()
+
+    @classmethod
+    def load(cls, path) -> 'PromptIndex':
+        """Load a saved index; one saved with other hashes comes back empty, to be rebuilt."""
+        index = cls()
+        with np.load(path) as data:
+            if 'hash_version' not in data or int(data['hash_version']) != HASH_VERSION:
+                return index
+            index.signatures = data['signatures']
+            index.ids = data['ids']
+            index.sorted_keys = data['sorted_keys']
+            index.sorted_rows = data['sorted_rows']
+            index.last_id = int(data['last_id'])
+        index.saved_id = index.last_id
+        return index
+
+
+def get_index_path():
+    return getattr(settings, 'PROMPT_INDEX_PATH', settings.BASE_DIR / 'prompt_index.npz')
+
+
+def sync_prompt_index(index: PromptIndex, batch_size: int = 10000) -> int:
+    """
+    Add history rows created since the index was last synced.
+
+    Returns the number of rows added. Rows are replayed in id order, so
+    every process converges on the same index regardless of which worker
+    stored each prompt.
+    """
+    from .models import GenerationHistory
+
+    rows, last_id = [], index.last_id
+    while True:
+        batch = list(
+            GenerationHistory.objects.filter(id__gt=last_id)
+            .order_by('id').values_list('id', 'prompt')[:batch_size]
+        )
+        rows.extend(batch)
+        if len(batch) < batch_size:
+            break
+        last_id = batch[-1][0]
+
+    if len(rows) >= _MERGE_THRESHOLD:
+        # Bulk replay: one merge instead of one per merge threshold
+        index.extend([r[0] for r in rows], [r[1] for r in rows])
+        index.save(get_index_path())
+    else:
+        for history_id, prompt in rows:
+            index.add(history_id, prompt)
+    index.last_sync = time.monotonic()
+    save_interval = float(getattr(settings, 'PROMPT_INDEX_SAVE_INTERVAL', 300))
+    if index.last_id > index.saved_id and time.monotonic() - index.last_save >= save_interval:
+        save_prompt_index_async(index)
+    return len(rows)
+
+
+def save_prompt_index_async(index: PromptIndex):
+    """Save the index on a background thread, unless a save is already running."""
+    with index.lock:
+        if index.saving:
+            return
+        index.saving = True
+
+    def run():
+        try:
+            index.save(get_index_path())
+        finally:
+            index.saving = False
+
+    threading.Thread(target=run, name='prompt-index-save', daemon=True).start()
+
+
+def _save_at_exit():
+    """Persist rows added since the last save when the process shuts down."""
+    if _index is not None and _index.last_id > _index.saved_id:
+        try:
+            _index.save(get_index_path())
+        except OSError:
+            pass
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_prompt_index(sync: bool = True) -> PromptIndex:
+    """
+    Return the process-wide prompt index.
+
+    Loads the persisted index on first use and replays newer history rows;
+    later calls re-sync at most every ``PROMPT_INDEX_SYNC_INTERVAL`` seconds.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            path = get_index_path()
+            _index = PromptIndex.load(path) if os.path.exists(path) else PromptIndex()
+            sync_prompt_index(_index)
+        elif sync:
+            interval = float(getattr(settings, 'PROMPT_INDEX_SYNC_INTERVAL', 5))
+            if time.monotonic() - _index.last_sync >= interval:
+                sync_prompt_index(_index)
+        return _index
+
+
+atexit.register(_save_at_exit)
+
+
+def approximate_matching_enabled() -> bool:
+    return bool(getattr(settings, 'APPROXIMATE_PROMPT_MATCHING', False))
+
+
+def find_similar_prompt(prompt: str):
+    """
+    Return ``(GenerationHistory, similarity)`` for the nearest cached prompt.
+
+    Returns None if no prompt reaches ``PROMPT_SIMILARITY_THRESHOLD``.
+    """
+    from .models import GenerationHistory
+
+    threshold = float(getattr(settings, 'PROMPT_SIMILARITY_THRESHOLD', 0.8))
+    match = get_prompt_index().query(prompt, threshold)
+    if match is None:
+        return None
+    history_id, similarity = match
+    history = GenerationHistory.objects.filter(id=history_id).first()
+    if history is None:
+        return None
+    return history, similarity
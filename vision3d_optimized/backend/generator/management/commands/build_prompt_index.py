@@ -0,0 +1,71 @@
+"""
+Rebuild the approximate-match prompt index, or benchmark it on synthetic data.
+"""
+
+import random
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from generator.lsh import PromptIndex, get_index_path, sync_prompt_index
+
+
+_WORDS = (
+    'red blue green yellow purple orange gold silver black white low poly tiny huge '
+    'robot car pendant dragon cube sphere cylinder cone torus ring vase castle tree '
+    'house chair lamp ship rocket owl cat dog fish crown sword shield cup mug bowl'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the MinHash LSH prompt index from GenerationHistory and save it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--benchmark', type=int, metavar='N',
+                            help='Benchmark build and lookup on N synthetic prompts instead')
+        parser.add_argument('--queries', type=int, default=1000,
+                            help='Number of lookups to time when benchmarking')
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            self.benchmark(options['benchmark'], options['queries'])
+            return
+
+        start = time.perf_counter()
+        index = PromptIndex()
+        added = sync_prompt_index(index)
+        index.save(get_index_path())
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {added} prompts in {time.perf_counter() - start:.1f}s -> {get_index_path()}'
+        ))
+
+    def benchmark(self, size: int, queries: int):
+        rng = random.Random(0)
+        prompts = [' '.join(rng.sample(_WORDS, rng.randint(3, 6))) + f' v{i}' for i in range(size)]
+
+        index = PromptIndex()
+        start = time.perf_counter()
+        index.extend(list(range(1, size + 1)), prompts)
+        build = time.perf_counter() - start
+
+        memory = sum(a.nbytes for a in (index.signatures, index.ids, index.sorted_keys, index.sorted_rows))
+
+        # Half exact re-queries, half light rewordings (dropped last word)
+        sources = [rng.randrange(size) for _ in range(queries)]
+        samples = [prompts[j] if i % 2 else prompts[j].rsplit(' ', 1)[0] + ' please'
+                   for i, j in enumerate(sources)]
+        timings, hits, correct = [], 0, 0
+        for source, prompt in zip(sources, samples):
+            t = time.perf_counter()
+            match = index.query(prompt, 0.5)
+            timings.append(time.perf_counter() - t)
+            hits += match is not None
+            # Reworded prompts may legitimately match a near-duplicate, so
+            # count a hit as correct if its words match the source's
+            correct += match is not None and set(prompts[match[0] - 1].split()[:-1]) == set(prompts[source].split()[:-1])
+        timings = np.array(timings) * 1000
+
+        self.stdout.write(
+            f'prompts={size} build={build:.1f}s memory={memory / 2**20:.0f}MB '
+            f'lookup p50={np.percentile(timings, 50):.3f}ms p99={np.percentile(timings, 99):.3f}ms '
+            f'hit_rate={hits / queries:.2f} correct={correct / queries:.2f}'
+        )
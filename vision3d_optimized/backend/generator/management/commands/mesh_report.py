@@ -0,0 +1,45 @@
+"""
+Report vertex cache efficiency and GLB size of each shape template with and
+without index optimization.
+"""
+
+import time
+import zlib
+from django.core.management.base import BaseCommand
+from generator.encoding import encode_compact_glb
+from generator.meshopt import CACHE_SIZE, acmr, optimize_indices
+from generator.shapes import SHAPE_BUILDERS, create_mesh_from_prompt, flatten_geometry
+
+
+class Command(BaseCommand):
+    help = 'Print ACMR and raw/deflated GLB size per shape before and after index optimization.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cache-size', type=int, default=CACHE_SIZE,
+                            help='FIFO vertex cache entries to simulate')
+
+    def handle(self, *args, **options):
+        cache_size = options['cache_size']
+        self.stdout.write(
+            f'{"shape":<9} {"faces":>6} {"verts":>6} {"acmr":>13} '
+            f'{"glb bytes":>13} {"deflated":>13} {"optimize":>9}'
+        )
+        for shape in SHAPE_BUILDERS:
+            mesh = create_mesh_from_prompt(shape)
+            welded = flatten_geometry(mesh).copy()
+            welded.merge_vertices()
+            faces = welded.faces
+
+            start = time.perf_counter()
+            _, optimized = optimize_indices(welded.vertices, faces, cache_size)
+            elapsed = (time.perf_counter() - start) * 1000
+
+            before = encode_compact_glb(mesh, optimize=False)
+            after = encode_compact_glb(mesh, optimize=True)
+            self.stdout.write(
+                f'{shape:<9} {len(faces):>6} {len(welded.vertices):>6} '
+                f'{acmr(faces, cache_size):>5.3f} -> {acmr(optimized, cache_size):.3f} '
+                f'{len(before):>6} -> {len(after):<6}'
+                f'{len(zlib.compress(before, 9)):>6} -> {len(zlib.compress(after, 9)):<6}'
+                f'{elapsed:>7.1f}ms'
+            )
@@ -0,0 +1,41 @@
+"""
+Regenerate artifacts made by an older generator version, hottest first.
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from generator.backends import get_generator_version
+from generator.regeneration import regenerate_stale, stale_entries
+
+
+class Command(BaseCommand):
+    help = ('Regenerate history entries whose artifact was made by another generator version, '
+            'in order of access count. Old artifacts keep being served until replaced.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Regenerate at most N entries per pass')
+        parser.add_argument('--prune', action='store_true',
+                            help='Delete superseded artifacts, previews and exports after each switch')
+        parser.add_argument('--delay', type=float, default=0.0,
+                            help='Seconds to sleep between entries')
+        parser.add_argument('--interval', type=float,
+                            help='Keep running, starting a new pass every N seconds')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many entries are stale')
+
+    def handle(self, *args, **options):
+        version = get_generator_version()
+        if options['dry_run']:
+            self.stdout.write(f'{stale_entries(version).count()} stale entries (current version {version})')
+            return
+
+        while True:
+            start = time.perf_counter()
+            counts = regenerate_stale(options['limit'], options['prune'], options['delay'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{version}: replaced {counts['replaced']}, skipped {counts['skipped']}, "
+                f"failed {counts['failed']} in {time.perf_counter() - start:.1f}s"
+            ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
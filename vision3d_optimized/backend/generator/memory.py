@@ -0,0 +1,163 @@
+"""
+Per-stage memory accounting and budgets for generation.
+
+Each generation and export stage records:
+
+- RSS delta: how much the process's resident set grew across the stage,
+  which is what the host sees;
+- peak traced allocation: the high-water mark of Python and NumPy
+  allocations made during the stage (``tracemalloc``), which is what a
+  heavier backend or a finer subdivision level actually costs. Jobs in
+  isolated worker processes are always traced: a worker runs one job at a
+  time, so the peak is exact. Tracing the threaded web process slows every
+  request and mixes their allocations, so in-process stages (the default
+  ``keyword`` backend and every export) are only traced with
+  ``MEMORY_TRACE_IN_PROCESS``; otherwise they record RSS delta alone.
+
+Both go into the shared metrics histograms, so ``/metrics`` and the stats
+endpoint expose percentiles for sizing workers.
+
+``GENERATION_MEMORY_BUDGET_MB`` applies to worker jobs. The pool kills a
+worker as soon as its RSS grows past the budget during a job, and a job
+whose traced peak went over it between polls is discarded when it returns.
+Either way generation is, depending on ``GENERATION_MEMORY_POLICY``,
+rerouted to the fallback backend or aborted. In-process backends are
+checked against the budget after the fact, and only when traced, so the
+default configuration enforces no cap.
+"""
+
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from django.conf import settings
+from . import metrics
+
+
+class MemoryBudgetExceeded(Exception):
+    """Raised when a worker job's memory use is over budget."""
+
+    def __init__(self, message: str, usage: dict):
+        super().__init__(message)
+        self.usage = usage
+
+
+def read_rss_bytes(pid: int = None):
+    """Return the resident set size of a process, or None if unavailable."""
+    try:
+        with open(f'/proc/{pid or os.getpid()}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def get_memory_budget() -> int:
+    """Configured per-generation budget in bytes (0 disables the check)."""
+    return int(getattr(settings, 'GENERATION_MEMORY_BUDGET_MB', 1024)) * 1024 * 1024
+
+
+def get_memory_policy() -> str:
+    """'reroute' to the fallback backend or 'abort' the request."""
+    return getattr(settings, 'GENERATION_MEMORY_POLICY', 'reroute')
+
+
+def trace_in_process() -> bool:
+    """Whether stages in the web process are traced (slows all threads)."""
+    return bool(getattr(settings, 'MEMORY_TRACE_IN_PROCESS', False))
+
+
+_lock = threading.Lock()
+_tracing_users = 0
+_started_tracing = False
+
+
+def _start_tracing() -> int:
+    global _tracing_users, _started_tracing
+    with _lock:
+        if _tracing_users == 0:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _started_tracing = True
+            tracemalloc.reset_peak()
+        _tracing_users += 1
+        return tracemalloc.get_traced_memory()[0]
+
+
+def _stop_tracing() -> int:
+    global _tracing_users, _started_tracing
+    with _lock:
+        _tracing_users -= 1
+        peak = tracemalloc.get_traced_memory()[1]
+        if _tracing_users == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+        return peak
+
+
+@contextmanager
+def measure_memory(trace: bool = None):
+    """
+    Measure the enclosed block; yields a dict filled in on exit with
+    ``rss_delta_bytes`` and, if traced, ``peak_traced_bytes`` (None
+    otherwise). ``trace`` defaults to ``MEMORY_TRACE_IN_PROCESS``.
+    """
+    if trace is None:
+        trace = trace_in_process()
+    usage = {'peak_traced_bytes': None, 'rss_delta_bytes': 0}
+    rss_before = read_rss_bytes()
+    baseline = _start_tracing() if trace else None
+    try:
+        yield usage
+    finally:
+        if trace:
+            usage['peak_traced_bytes'] = max(_stop_tracing() - baseline, 0)
+        rss_after = read_rss_bytes()
+        if rss_before is not None and rss_after is not None:
+            usage['rss_delta_bytes'] = rss_after - rss_before
+
+
+def record_usage(stage: str, usage: dict):
+    """Add one stage's measurements to the shared histograms."""
+    labels = {'stage': stage}
+    if usage['peak_traced_bytes'] is not None:
+        metrics.observe('vision3d_stage_peak_memory_bytes', usage['peak_traced_bytes'], labels)
+    metrics.observe('vision3d_stage_rss_delta_bytes', max(usage['rss_delta_bytes'], 0), labels)
+
+
+@contextmanager
+def track_memory(stage: str):
+    """Measure the enclosed block and record it under ``stage``."""
+    usage = None
+    try:
+        with measure_memory() as usage:
+            yield usage
+    finally:
+        if usage is not None:
+            record_usage(stage, usage)
+
+
+def check_budget(usage: dict, budget: int = None):
+    """Raise MemoryBudgetExceeded if a measured stage went over budget."""
+    if budget is None:
+        budget = get_memory_budget()
+    peak = max(usage['peak_traced_bytes'] or 0, usage['rss_delta_bytes'])
+    if budget and peak > budget:
+        raise MemoryBudgetExceeded(
+            f"Generation exceeded memory budget ({peak // 2**20} MB > {budget // 2**20} MB)", usage
+        )
+
+
+def memory_percentiles() -> dict:
+    """p50/p90/p99 of each recorded stage, in MB, across all host processes."""
+    totals = metrics.collect()
+    result = {}
+    for name, field in [('vision3d_stage_peak_memory_bytes', 'peak_traced_mb'),
+                        ('vision3d_stage_rss_delta_bytes', 'rss_delta_mb')]:
+        for labels, values in metrics.histogram_quantiles(name, (0.5, 0.9, 0.99), totals).items():
+            stage = dict(labels).get('stage')
+            entry = result.setdefault(stage, {})
+            entry[field] = {
+                f'p{int(q * 100)}': round(v / 2**20, 2) for q, v in values['quantiles'].items()
+            }
+            entry['count'] = int(values['count'])
+    return result
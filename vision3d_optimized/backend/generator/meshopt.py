@@ -0,0 +1,168 @@
+"""
+Index and vertex ordering for GPU-friendly exports.
+
+``trimesh.creation`` and ``trimesh.util.concatenate`` emit triangles in
+construction order, which jumps around the mesh and defeats the viewer's
+post-transform vertex cache. Before a mesh is encoded it is:
+
+- welded (duplicate vertices merged by the encoder) and stripped of
+  vertices no triangle references;
+- reordered triangle by triangle with Tipsify (Sander, Nehab and Barczak,
+  "Fast Triangle Reordering for Vertex Locality and Reduced Overdraw",
+  2007), a linear-time greedy fan walk aimed at a FIFO cache;
+- reordered vertex by vertex in order of first use, so vertex fetch walks
+  the buffer forward instead of jumping across it.
+
+``acmr`` simulates a FIFO cache to measure the result: the average number
+of vertex shader invocations per triangle, 3.0 at worst and about 0.5 for
+a well ordered regular grid. Tipsify tracks the same FIFO model as it
+walks, so only the input order needs a separate ``acmr`` pass.
+
+Both are pure-Python loops (about 0.5 s per 100k triangles), so meshes
+above ``max_faces`` skip the triangle reorder and only get the vectorized
+vertex reorder.
+"""
+
+from collections import deque
+import numpy as np
+
+
+CACHE_SIZE = 16
+
+# Largest mesh the triangle reorder runs on
+MAX_FACES = 50000
+
+
+def acmr(faces: np.ndarray, cache_size: int = CACHE_SIZE) -> float:
+    """Average cache miss ratio of an index buffer under a FIFO cache."""
+    faces = np.asarray(faces, dtype=np.int64)
+    if len(faces) == 0:
+        return 0.0
+    cache = deque()
+    cached = set()
+    misses = 0
+    for v in faces.ravel().tolist():
+        if v in cached:
+            continue
+        misses += 1
+        cache.append(v)
+        cached.add(v)
+        if len(cache) > cache_size:
+            cached.discard(cache.popleft())
+    return misses / len(faces)
+
+
+def _vertex_triangles(faces: np.ndarray, vertex_count: int):
+    """CSR adjacency: triangles using vertex v are order[start[v]:start[v + 1]]."""
+    flat = faces.ravel()
+    order = np.argsort(flat, kind='stable') // 3
+    start = np.zeros(vertex_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(flat, minlength=vertex_count), out=start[1:])
+    return order.tolist(), start.tolist()
+
+
+def tipsify(faces: np.ndarray, vertex_count: int, cache_size: int = CACHE_SIZE):
+    """
+    Triangle order for post-transform cache locality.
+
+    Fans around the current vertex are emitted whole; the next fan vertex
+    is the neighbour that will still be in the cache after its remaining
+    triangles are drawn, falling back to recently touched vertices (the
+    dead-end stack) and then to a scan.
+
+    Returns:
+        (order, misses): a permutation of face indices and the FIFO cache
+        misses of the reordered faces, i.e. ``acmr(faces[order]) * len(faces)``
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    if len(faces) == 0:
+        return np.zeros(0, dtype=np.int64), 0
+    adjacency, start = _vertex_triangles(faces, vertex_count)
+    triangles = faces.tolist()
+    live = np.bincount(faces.ravel(), minlength=vertex_count).tolist()
+    timestamp = [0] * vertex_count
+    emitted = [False] * len(triangles)
+    dead_end = []
+    output = []
+    time = cache_size + 1
+    cursor = 0
+    fan = 0
+
+    while fan >= 0:
+        candidates = []
+        for t in adjacency[start[fan]:start[fan + 1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            output.append(t)
+            for v in triangles[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if time - timestamp[v] > cache_size:
+                    timestamp[v] = time
+                    time += 1
+
+        # Prefer the candidate that stays cached longest once its fan is drawn
+        fan, best = -1, -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = 0
+                if time - timestamp[v] + 2 * live[v] <= cache_size:
+                    priority = time - timestamp[v]
+                if priority > best:
+                    fan, best = v, priority
+        if fan >= 0:
+            continue
+        while dead_end:
+            v = dead_end.pop()
+            if live[v] > 0:
+                fan = v
+                break
+        else:
+            while cursor < vertex_count and live[cursor] == 0:
+                cursor += 1
+            if cursor < vertex_count:
+                fan = cursor
+
+    # Every miss advanced the clock by one
+    return np.asarray(output, dtype=np.int64), time - (cache_size + 1)
+
+
+def first_use_order(faces: np.ndarray):
+    """
+    Vertex order by first reference in the index buffer.
+
+    Returns (order, remapped_faces): ``vertices[order]`` is the new vertex
+    buffer and unreferenced vertices are dropped.
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    used, first = np.unique(faces.ravel(), return_index=True)
+    order = used[np.argsort(first)]
+    remap = np.empty(int(used.max()) + 1 if len(used) else 0, dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    return order, remap[faces]
+
+
+def optimize_indices(vertices: np.ndarray, faces: np.ndarray, cache_size: int = CACHE_SIZE,
+                     max_faces: int = MAX_FACES):
+    """
+    Reorder triangles for the vertex cache and vertices for fetch locality.
+
+    Expects welded input. The triangle order is kept if Tipsify does not
+    lower its ACMR, or if there are more than ``max_faces`` triangles.
+
+    Returns:
+        (vertices, faces) describing the same triangles
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    if len(faces) == 0:
+        return np.asarray(vertices), faces
+    if len(faces) <= max_faces:
+        order, misses = tipsify(faces, len(vertices), cache_size)
+        # Fan-built primitives (cylinders, cones) are often already better
+        # than what the greedy walk finds
+        if misses < acmr(faces, cache_size) * len(faces):
+            faces = faces[order]
+    order, faces = first_use_order(faces)
+    return np.asarray(vertices)[order], faces
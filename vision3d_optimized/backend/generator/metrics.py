@@ -0,0 +1,293 @@
+"""
+Multi-process metrics with OpenMetrics text exposition.
+
+Each worker process writes its samples into its own memory-mapped file under
+``METRICS_DIR``; a scrape of ``/metrics`` on any worker merges every file, so
+one scrape sees the whole host. Counters and histograms are summed across all
+files (including exited workers, so totals never go backwards); gauges are
+summed over live processes only.
+
+Clear ``METRICS_DIR`` when the service is (re)deployed.
+"""
+
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from django.conf import settings
+
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 64 KiB .. 16 GiB in powers of two
+_MEMORY_BUCKETS = tuple(float(2 ** i) for i in range(16, 35))
+
+# name -> (type, help, buckets)
+METRICS = {
+    'vision3d_requests': ('counter', 'HTTP requests handled, by view and status.', None),
+    'vision3d_cache_requests': ('counter', 'Cache lookups, by tier and result.', None),
+    'vision3d_stage_duration_seconds': ('histogram', 'Duration of each request stage.', _LATENCY_BUCKETS),
+    'vision3d_generation_failures': ('counter', 'Failed generation jobs, by backend.', None),
+    'vision3d_worker_restarts': ('counter', 'Generator worker processes replaced after dying, by backend.', None),
+    'vision3d_generation_queue_depth': ('gauge', 'Cache misses waiting for a generation slot.', None),
+    'vision3d_generation_active': ('gauge', 'Generation jobs currently running.', None),
+    'vision3d_admission_rejections': ('counter', 'Cache misses rejected by admission control.', None),
+    'vision3d_stage_peak_memory_bytes': ('histogram', 'Peak traced allocation of each generation stage.', _MEMORY_BUCKETS),
+    'vision3d_stage_rss_delta_bytes': ('histogram', 'Growth of process RSS across each generation stage.', _MEMORY_BUCKETS),
+    'vision3d_memory_budget_exceeded': ('counter', 'Generations over the memory budget, by backend and policy.', None),
+    'vision3d_artifact_bytes': ('gauge', 'Bytes of generated artifacts on disk.', None),
+    'vision3d_artifacts': ('gauge', 'Number of generated artifacts on disk.', None),
+    'vision3d_regenerations': ('counter', 'Stale artifacts processed by the regeneration job, by result.', None),
+}
+
+
+def get_metrics_dir() -> Path:
+    """Return the directory shared by all worker processes on this host."""
+    return Path(settings.METRICS_DIR)
+
+
+class _MmapedValues:
+    """
+    Append-only key -> float64 store backed by a memory-mapped file.
+
+    Layout: an int32 header with the number of used bytes, then records of
+    ``int32 key length, utf-8 key padded to 8 bytes, float64 value``.
+    """
+    _INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path: Path):
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(self._INITIAL_SIZE)
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._used = struct.unpack_from('i', self._map, 0)[0]
+        if self._used == 0:
+            self._used = 8
+            struct.pack_into('i', self._map, 0, self._used)
+        self._positions = {key: pos for key, _, pos in _read_records(self._map, self._used)}
+
+    def _position(self, key: str) -> int:
+        if key not in self._positions:
+            encoded = key.encode('utf-8')
+            padded = encoded + b' ' * (8 - (len(encoded) + 4) % 8)
+            record = struct.pack(f'i{len(padded)}sd', len(encoded), padded, 0.0)
+            while self._used + len(record) > self._capacity:
+                self._capacity *= 2
+                self._file.truncate(self._capacity)
+                self._map = mmap.mmap(self._file.fileno(), self._capacity)
+            self._map[self._used:self._used + len(record)] = record
+            self._used += len(record)
+            struct.pack_into('i', self._map, 0, self._used)
+            self._positions[key] = self._used - 8
+        return self._positions[key]
+
+    def add(self, key: str, amount: float):
+        pos = self._position(key)
+        value = struct.unpack_from('d', self._map, pos)[0]
+        struct.pack_into('d', self._map, pos, value + amount)
+
+    def set(self, key: str, value: float):
+        struct.pack_into('d', self._map, self._position(key), value)
+
+
+def _read_records(data, used: int):
+    pos = 8
+    while pos < used:
+        length = struct.unpack_from('i', data, pos)[0]
+        pos += 4
+        key = bytes(data[pos:pos + length]).decode('utf-8')
+        pos += length + (8 - (length + 4) % 8)
+        yield key, struct.unpack_from('d', data, pos)[0], pos
+        pos += 8
+
+
+def _read_file(path: str):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < 8:
+        return []
+    used = min(struct.unpack_from('i', data, 0)[0], len(data))
+    return [(key, value) for key, value, _ in _read_records(data, used)]
+
+
+_lock = threading.Lock()
+_stores = {}
+_store_pid = None
+
+
+def _store(kind: str) -> _MmapedValues:
+    """Return this process's store for ``kind``, reopening after a fork."""
+    global _store_pid
+    pid = os.getpid()
+    if _store_pid != pid:
+        _stores.clear()
+        _store_pid = pid
+    if kind not in _stores:
+        directory = get_metrics_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        _stores[kind] = _MmapedValues(directory / f'{kind}_{pid}.db')
+    return _stores[kind]
+
+
+def _key(name: str, sample: str, labels: dict) -> str:
+    return json.dumps([name, sample, sorted((labels or {}).items())])
+
+
+def inc(name: str, labels: dict = None, amount: float = 1.0):
+    """Increment a counter."""
+    with _lock:
+        _store('counter').add(_key(name, name + '_total', labels), amount)
+
+
+def set_gauge(name: str, value: float, labels: dict = None):
+    """Set this process's contribution to a gauge."""
+    with _lock:
+        _store('gauge').set(_key(name, name, labels), value)
+
+
+def observe(name: str, value: float, labels: dict = None):
+    """Record one observation in a histogram."""
+    buckets = METRICS[name][2]
+    labels = dict(labels or {})
+    with _lock:
+        store = _store('histogram')
+        for bound in buckets:
+            # Adding 0 still creates the bucket, so every series exposes all bounds
+            store.add(_key(name, name + '_bucket', {**labels, 'le': str(bound)}),
+                      1.0 if value <= bound else 0.0)
+        store.add(_key(name, name + '_bucket', {**labels, 'le': '+Inf'}), 1.0)
+        store.add(_key(name, name + '_count', labels), 1.0)
+        store.add(_key(name, name + '_sum', labels), value)
+
+
+@contextmanager
+def time_stage(stage: str):
+    """Observe the duration of the enclosed block as a request stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('vision3d_stage_duration_seconds', time.perf_counter() - start, {'stage': stage})
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect() -> dict:
+    """Merge samples from every process on the host: key -> value."""
+    totals = {}
+    for path in glob.glob(str(get_metrics_dir() / '*.db')):
+        kind, _, pid = Path(path).stem.rpartition('_')
+        if kind == 'gauge' and not _pid_alive(int(pid)):
+            continue
+        try:
+            records = _read_file(path)
+        except OSError:
+            continue
+        for key, value in records:
+            totals[key] = totals.get(key, 0.0) + value
+
+    # Artifact storage is host-wide, so it is measured at scrape time
+    artifacts = [p for p in Path(settings.MEDIA_ROOT).glob('*') if p.is_file()]
+    totals[_key('vision3d_artifact_bytes', 'vision3d_artifact_bytes', None)] = float(
+        sum(p.stat().st_size for p in artifacts)
+    )
+    totals[_key('vision3d_artifacts', 'vision3d_artifacts', None)] = float(len(artifacts))
+    return totals
+
+
+def histogram_quantiles(name: str, quantiles, totals: dict = None) -> dict:
+    """
+    Estimate quantiles of a histogram from its merged buckets.
+
+    Returns ``{labels: {'count': n, 'quantiles': {q: value}}}`` per label set,
+    interpolating linearly inside the bucket that holds each rank (the same
+    approximation as Prometheus' ``histogram_quantile``).
+    """
+    if totals is None:
+        totals = collect()
+    series = {}
+    for key, value in totals.items():
+        metric, sample, labels = json.loads(key)
+        if metric != name or sample != name + '_bucket':
+            continue
+        labels = dict(labels)
+        le = labels.pop('le')
+        bound = float('inf') if le == '+Inf' else float(le)
+        series.setdefault(tuple(sorted(labels.items())), {})[bound] = value
+
+    bounds = list(METRICS[name][2]) + [float('inf')]
+    result = {}
+    for labels, counts in series.items():
+        # A bucket nobody has written yet holds no observations
+        buckets = [(bound, counts.get(bound, 0.0)) for bound in bounds]
+        count = buckets[-1][1]
+        if count <= 0:
+            continue
+        values = {}
+        for q in quantiles:
+            rank = q * count
+            lower, below = 0.0, 0.0
+            for bound, cumulative in buckets:
+                if cumulative >= rank:
+                    if bound == float('inf'):
+                        values[q] = lower
+                    else:
+                        inside = cumulative - below
+                        values[q] = lower + (bound - lower) * ((rank - below) / inside if inside else 1.0)
+                    break
+                lower, below = bound, cumulative
+        result[labels] = {'count': count, 'quantiles': values}
+    return result
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        '{}="{}"'.format(k, str(v).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"'))
+        for k, v in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def render_openmetrics() -> str:
+    """Render all metrics in the OpenMetrics text format."""
+    families = {name: [] for name in METRICS}
+    for key, value in collect().items():
+        name, sample, labels = json.loads(key)
+        if name in families:
+            families[name].append((sample, labels, value))
+
+    lines = []
+    for name, (kind, help_text, _) in METRICS.items():
+        lines.append(f'# TYPE {name} {kind}')
+        lines.append(f'# HELP {name} {help_text}')
+        samples = families[name]
+        if kind == 'histogram':
+            # Buckets must be ordered by increasing 'le' within each label set
+            def order(item):
+                sample, labels, _ = item
+                le = dict(labels).get('le')
+                bound = float('inf') if le in (None, '+Inf') else float(le)
+                rest = [pair for pair in labels if pair[0] != 'le']
+                return (rest, sample != name + '_bucket', bound, sample)
+            samples.sort(key=order)
+        else:
+            samples.sort()
+        for sample, labels, value in samples:
+            lines.append(f'{sample}{_format_labels(labels)} {value!r}')
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
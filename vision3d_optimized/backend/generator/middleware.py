@@ -0,0 +1,24 @@
+"""
+Request metrics middleware.
+"""
+
+import time
+from . import metrics
+
+
+class MetricsMiddleware:
+    """Count requests by view and status and time the whole request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unmatched'
+        if view != 'metrics':
+            metrics.observe('vision3d_stage_duration_seconds', time.perf_counter() - start,
+                            {'stage': 'request'})
+        metrics.inc('vision3d_requests', {'view': view, 'status': str(response.status_code)})
+        return response
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerformanceMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('cache_hit', models.BooleanField(default=False)),
+                ('response_time', models.FloatField(help_text='Total response time in seconds')),
+                ('generation_time', models.FloatField(blank=True, help_text='Model generation time if not cached', null=True)),
+                ('prompt_length', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Performance Metric',
+                'verbose_name_plural': 'Performance Metrics',
+                'ordering': ['-timestamp'],
+            },
+        ),
+        migrations.CreateModel(
+            name='GenerationHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prompt', models.TextField(help_text='Text prompt used for generation')),
+                ('prompt_hash', models.CharField(db_index=True, help_text='SHA256 hash of the prompt for fast lookup', max_length=64, unique=True)),
+                ('model_file', models.CharField(help_text='Path to generated GLB file', max_length=255)),
+                ('generation_time', models.FloatField(help_text='Time taken to generate in seconds')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('access_count', models.IntegerField(default=1, help_text='Number of times this model was accessed')),
+                ('last_accessed', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Generation History',
+                'verbose_name_plural': 'Generation Histories',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['prompt_hash'], name='generator_g_prompt__b343dc_idx'), models.Index(fields=['-created_at'], name='generator_g_created_660944_idx'), models.Index(fields=['-access_count'], name='generator_g_access__35137b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+"""
+SQLite FTS5 index over GenerationHistory.prompt.
+
+The index is an external-content FTS5 table kept in sync by triggers, so
+every insert, update and delete (including bulk queryset operations) is
+reflected without application code. Other database backends skip this
+migration and search falls back to ``icontains``.
+"""
+
+from django.db import migrations
+
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS generator_prompt_fts USING fts5(
+        prompt,
+        content='generator_generationhistory',
+        content_rowid='id',
+        prefix='2 3',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS generator_prompt_fts_ai
+    AFTER INSERT ON generator_generationhistory BEGIN
+        INSERT INTO generator_prompt_fts(rowid, prompt) VALUES (new.id, new.prompt);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS generator_prompt_fts_ad
+    AFTER DELETE ON generator_generationhistory BEGIN
+        INSERT INTO generator_prompt_fts(generator_prompt_fts, rowid, prompt)
+        VALUES ('delete', old.id, old.prompt);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS generator_prompt_fts_au
+    AFTER UPDATE OF prompt ON generator_generationhistory BEGIN
+        INSERT INTO generator_prompt_fts(generator_prompt_fts, rowid, prompt)
+        VALUES ('delete', old.id, old.prompt);
+        INSERT INTO generator_prompt_fts(rowid, prompt) VALUES (new.id, new.prompt);
+    END
+    """,
+    "INSERT INTO generator_prompt_fts(generator_prompt_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS generator_prompt_fts_ai",
+    "DROP TRIGGER IF EXISTS generator_prompt_fts_ad",
+    "DROP TRIGGER IF EXISTS generator_prompt_fts_au",
+    "DROP TABLE IF EXISTS generator_prompt_fts",
+]
+
+
+def create_prompt_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_prompt_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prompt_index, drop_prompt_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0002_prompt_fts'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='generationhistory',
+            name='generator_g_created_660944_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='generationhistory',
+            name='generator_g_access__35137b_idx',
+        ),
+        migrations.AddIndex(
+            model_name='generationhistory',
+            index=models.Index(fields=['-created_at', '-id'], name='generator_g_created_3b23c2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='generationhistory',
+            index=models.Index(fields=['-access_count', '-id'], name='generator_g_access__990fba_idx'),
+        ),
+    ]
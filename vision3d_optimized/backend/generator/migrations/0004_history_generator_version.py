@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:56
+
+import importlib
+from django.db import migrations, models
+
+
+# Adding a NOT NULL column makes Django's SQLite backend rebuild the table,
+# which drops the FTS sync triggers from 0002; recreate them afterwards (and
+# again when unapplying, which rebuilds the table once more)
+_prompt_fts = importlib.import_module('generator.migrations.0002_prompt_fts')
+
+
+def restore_prompt_fts_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in _prompt_fts.CREATE_SQL:
+        if statement.strip().startswith('CREATE TRIGGER'):
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0003_history_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_prompt_fts_triggers),
+        migrations.AddField(
+            model_name='generationhistory',
+            name='generator_version',
+            field=models.CharField(blank=True, default='', help_text='Generator version that produced model_file', max_length=64),
+        ),
+        migrations.RunPython(restore_prompt_fts_triggers, migrations.RunPython.noop),
+    ]
@@ -10,6 +10,8 @@ class GenerationHistory(models.Model):
     prompt_hash = models.CharField(max_length=64, unique=True, db_index=True, 
                                    help_text="SHA256 hash of the prompt for fast lookup")
     model_file = models.CharField(max_length=255, help_text="Path to generated GLB file")
+    generator_version = models.CharField(max_length=64, default='', blank=True,
+                                         help_text="Generator version that produced model_file")
     generation_time = models.FloatField(help_text="Time taken to generate in seconds")
     created_at = models.DateTimeField(default=timezone.now, db_index=True)
     access_count = models.IntegerField(default=1, help_text="Number of times this model was accessed")
@@ -21,8 +23,9 @@ class GenerationHistory(models.Model):
         verbose_name_plural = 'Generation Histories'
         indexes = [
             models.Index(fields=['prompt_hash']),
-            models.Index(fields=['-created_at']),
-            models.Index(fields=['-access_count']),
+            # id breaks ties so keyset pagination can seek within one index
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['-access_count', '-id']),
         ]
     
     def __str__(self):
@@ -0,0 +1,88 @@
+"""
+Keyset (seek) pagination over ``GenerationHistory``.
+
+Each ordering walks a composite ``(key DESC, id DESC)`` index, and a cursor
+holds the key and id of the last row served. The next page is a range
+seek from that position instead of an ``OFFSET``, so page 1,000 costs the
+same as page 1. Cursors are opaque URL-safe tokens; clients pass them back
+unchanged.
+"""
+
+import base64
+import binascii
+import json
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from .models import GenerationHistory
+
+
+# ordering name -> (key field, parse cursor value)
+ORDERINGS = {
+    'recent': ('created_at', parse_datetime),
+    'popular': ('access_count', int),
+}
+
+LIST_FIELDS = ['id', 'prompt', 'prompt_hash', 'model_file', 'created_at', 'access_count']
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that were not produced by ``encode_cursor``."""
+
+
+def encode_cursor(ordering: str, key, pk: int) -> str:
+    if hasattr(key, 'isoformat'):
+        key = key.isoformat()
+    raw = json.dumps([ordering, key, pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor: str, ordering: str):
+    """Return ``(key, id)`` from a cursor issued for ``ordering``."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_ordering, key, pk = json.loads(raw)
+        key = ORDERINGS[ordering][1](key)
+        pk = int(pk)
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor("Invalid cursor")
+    if cursor_ordering != ordering or key is None:
+        raise InvalidCursor("Cursor does not match the requested ordering")
+    return key, pk
+
+
+def paginate_history(ordering: str = 'recent', cursor: str = None, limit: int = 20):
+    """
+    Return one page of history rows and the cursor for the next page.
+
+    Args:
+        ordering: 'recent' (newest first) or 'popular' (most accessed first)
+        cursor: Token from a previous page, or None for the first page
+        limit: Page size
+
+    Returns:
+        (rows, next_cursor); next_cursor is None on the last page.
+
+    'popular' is keyed on a counter that keeps changing, so a row whose
+    count moves past the cursor between requests may be skipped or repeated.
+    """
+    if ordering not in ORDERINGS:
+        raise InvalidCursor(f"Unknown ordering '{ordering}'")
+    field = ORDERINGS[ordering][0]
+    queryset = GenerationHistory.objects.only(*LIST_FIELDS).order_by(f'-{field}', '-id')
+
+    if cursor:
+        key, pk = decode_cursor(cursor, ordering)
+        # The first condition is a plain range on the index's leading column;
+        # the second only breaks ties on the boundary key
+        queryset = queryset.filter(**{f'{field}__lte': key}).filter(
+            Q(**{f'{field}__lt': key}) | Q(id__lt=pk)
+        )
+
+    # Fetch one extra row to know whether another page exists
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(ordering, getattr(last, field), last.id)
+    return rows, next_cursor
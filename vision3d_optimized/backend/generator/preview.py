@@ -0,0 +1,190 @@
+"""
+CPU-only preview thumbnails for generated models.
+
+A small NumPy software rasterizer: triangles are projected with an
+orthographic or perspective camera, back faces are culled, every
+(triangle, pixel) candidate pair is tested in one vectorized pass, and a
+z-buffer keeps the nearest fragment per pixel. Faces are flat shaded with one
+directional light plus ambient, rendered at 2x and box-filtered down.
+
+Previews are written next to each artifact (``model_<hash>.<format>``) so
+history and gallery views can show a model for a few kilobytes.
+"""
+
+import io
+import os
+import tempfile
+from pathlib import Path
+import numpy as np
+from django.conf import settings
+
+
+_SUPERSAMPLE = 2
+_AMBIENT = 0.35
+_FILL = 0.9
+_CAMERA_DISTANCE = 3.0  # in bounding-sphere radii
+_LIGHT_DIR = np.array([0.4, -0.5, 0.75])
+_EYE_DIR = np.array([1.0, -1.3, 0.8])
+_DEFAULT_COLOR = np.array([180, 180, 180, 255], dtype=np.uint8)
+
+
+def get_preview_format() -> str:
+    return getattr(settings, 'PREVIEW_FORMAT', 'webp')
+
+
+def get_preview_path(model_path: Path) -> Path:
+    """Preview file stored alongside a model artifact."""
+    return Path(model_path).with_suffix(f'.{get_preview_format()}')
+
+
+def _face_colors(mesh) -> np.ndarray:
+    """Per-face RGBA colors from vertex/face colors or a material base color."""
+    visual = mesh.visual
+    if visual.kind in ('vertex', 'face'):
+        return np.asarray(visual.face_colors, dtype=np.uint8)
+    material = getattr(visual, 'material', None)
+    color = getattr(material, 'main_color', None)
+    if color is None:
+        color = _DEFAULT_COLOR
+    return np.tile(np.asarray(color, dtype=np.uint8), (len(mesh.faces), 1))
+
+
+def _look_at(eye_dir: np.ndarray) -> np.ndarray:
+    """Rotation taking world coordinates (z up) into camera coordinates."""
+    forward = -eye_dir / np.linalg.norm(eye_dir)
+    right = np.cross(forward, [0.0, 0.0, 1.0])
+    right /= np.linalg.norm(right)
+    up = np.cross(right, forward)
+    return np.stack([right, up, -forward])
+
+
+def render_preview(mesh, size: int = None, projection: str = None) -> np.ndarray:
+    """
+    Rasterize a mesh to an RGBA image.
+
+    Args:
+        mesh: Triangle mesh to draw
+        size: Output width and height in pixels
+        projection: 'perspective' or 'orthographic'
+
+    Returns:
+        (size, size, 4) uint8 array with a transparent background.
+    """
+    if size is None:
+        size = int(getattr(settings, 'PREVIEW_SIZE', 128))
+    if projection is None:
+        projection = getattr(settings, 'PREVIEW_PROJECTION', 'perspective')
+    res = size * _SUPERSAMPLE
+
+    vertices = np.asarray(mesh.vertices, dtype=np.float64)
+    faces = np.asarray(mesh.faces, dtype=np.int64)
+    image = np.zeros((res * res, 4), dtype=np.uint8)
+    if len(faces) == 0:
+        return image.reshape(res, res, 4)[::_SUPERSAMPLE, ::_SUPERSAMPLE].copy()
+
+    # Normalize into a unit sphere and move into camera space
+    center = (vertices.min(axis=0) + vertices.max(axis=0)) / 2
+    radius = np.linalg.norm(vertices - center, axis=1).max() or 1.0
+    rotation = _look_at(_EYE_DIR)
+    camera = (vertices - center) / radius @ rotation.T
+
+    if projection == 'perspective':
+        depth = _CAMERA_DISTANCE - camera[:, 2]
+        xy = camera[:, :2] / depth[:, None]
+    else:
+        depth = -camera[:, 2]
+        xy = camera[:, :2]
+
+    # Frame the projected silhouette with a small margin
+    xy_min, xy_max = xy.min(axis=0), xy.max(axis=0)
+    span = (xy_max - xy_min).max() or 1.0
+    xy = (xy - (xy_min + xy_max) / 2) * (2 * _FILL / span)
+    screen = (xy * np.array([1.0, -1.0]) + 1.0) * (res / 2.0)
+
+    tri_xy = screen[faces]
+    tri_depth = depth[faces]
+
+    # Flat shading from world-space face normals
+    a, b, c = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    normals = np.cross(b - a, c - a)
+    lengths = np.linalg.norm(normals, axis=1)
+    lengths[lengths == 0] = 1.0
+    normals /= lengths[:, None]
+    light = _LIGHT_DIR / np.linalg.norm(_LIGHT_DIR)
+    shade = _AMBIENT + (1 - _AMBIENT) * np.clip(normals @ light, 0.0, 1.0)
+    colors = _face_colors(mesh).astype(np.float64)
+    colors[:, :3] *= shade[:, None]
+
+    # Signed screen area; y is flipped, so front faces have negative area
+    e1 = tri_xy[:, 1] - tri_xy[:, 0]
+    e2 = tri_xy[:, 2] - tri_xy[:, 0]
+    area = e1[:, 0] * e2[:, 1] - e1[:, 1] * e2[:, 0]
+    front = area < -1e-9
+    tri_xy, tri_depth, area, colors = tri_xy[front], tri_depth[front], area[front], colors[front]
+    if len(area) == 0:
+        return image.reshape(res, res, 4)[::_SUPERSAMPLE, ::_SUPERSAMPLE].copy()
+
+    # Candidate (triangle, pixel) pairs from each triangle's bounding box
+    x0 = np.clip(np.ceil(tri_xy[:, :, 0].min(axis=1) - 0.5), 0, res).astype(np.int64)
+    x1 = np.clip(np.floor(tri_xy[:, :, 0].max(axis=1) - 0.5), -1, res - 1).astype(np.int64)
+    y0 = np.clip(np.ceil(tri_xy[:, :, 1].min(axis=1) - 0.5), 0, res).astype(np.int64)
+    y1 = np.clip(np.floor(tri_xy[:, :, 1].max(axis=1) - 0.5), -1, res - 1).astype(np.int64)
+    count_x = np.maximum(x1 - x0 + 1, 0)
+    count_y = np.maximum(y1 - y0 + 1, 0)
+    pairs = count_x * count_y
+    total = int(pairs.sum())
+    if total == 0:
+        return image.reshape(res, res, 4)[::_SUPERSAMPLE, ::_SUPERSAMPLE].copy()
+
+    tri = np.repeat(np.arange(len(area)), pairs)
+    local = np.arange(total) - np.repeat(np.cumsum(pairs) - pairs, pairs)
+    px = x0[tri] + local % count_x[tri]
+    py = y0[tri] + local // count_x[tri]
+
+    # Barycentric coordinates at pixel centers
+    t = tri_xy[tri]
+    sx, sy = px + 0.5, py + 0.5
+    w0 = ((t[:, 1, 0] - sx) * (t[:, 2, 1] - sy) - (t[:, 1, 1] - sy) * (t[:, 2, 0] - sx)) / area[tri]
+    w1 = ((t[:, 2, 0] - sx) * (t[:, 0, 1] - sy) - (t[:, 2, 1] - sy) * (t[:, 0, 0] - sx)) / area[tri]
+    w2 = 1.0 - w0 - w1
+    inside = (w0 >= 0) & (w1 >= 0) & (w2 >= 0)
+
+    tri, pixel = tri[inside], (py * res + px)[inside]
+    d = tri_depth[tri]
+    z = w0[inside] * d[:, 0] + w1[inside] * d[:, 1] + w2[inside] * d[:, 2]
+
+    # Z-buffer: keep the nearest fragment for each pixel
+    order = np.lexsort((z, pixel))
+    pixel, tri = pixel[order], tri[order]
+    first = np.r_[True, pixel[1:] != pixel[:-1]]
+    image[pixel[first]] = np.clip(colors[tri[first]], 0, 255).astype(np.uint8)
+
+    # Box-filter the supersampled image down to the output size
+    image = image.reshape(size, _SUPERSAMPLE, size, _SUPERSAMPLE, 4).astype(np.float64)
+    alpha = image[..., 3:].mean(axis=(1, 3))
+    rgb = (image[..., :3] * image[..., 3:]).mean(axis=(1, 3))
+    rgb = np.divide(rgb, alpha, out=np.zeros_like(rgb), where=alpha > 0)
+    return np.concatenate([rgb, alpha], axis=-1).round().astype(np.uint8)
+
+
+def encode_preview(image: np.ndarray, image_format: str = None) -> bytes:
+    """Encode an RGBA preview as PNG or WebP."""
+    from PIL import Image
+
+    image_format = (image_format or get_preview_format()).upper()
+    buffer = io.BytesIO()
+    options = {'quality': 80, 'method': 4} if image_format == 'WEBP' else {'optimize': True}
+    Image.fromarray(image, 'RGBA').save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def write_preview(mesh, model_path: Path) -> Path:
+    """Render and store the preview for an artifact; returns its path."""
+    preview_path = get_preview_path(model_path)
+    data = encode_preview(render_preview(mesh))
+    # Concurrent backfills of the same preview each write their own temp file
+    fd, tmp_path = tempfile.mkstemp(dir=preview_path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, preview_path)
+    return preview_path
@@ -0,0 +1,121 @@
+"""
+Background regeneration of artifacts made by an older generator version.
+
+Every history row records the generator version that produced its artifact
+(see ``backends.get_generator_version``). After a backend or
+``shapes.SHAPES_VERSION`` bump, rows with another version are stale:
+requests keep getting the old artifact while this job walks the rows by
+``access_count``, hottest first, writes each replacement under its new
+versioned name and only then points the row at it. Old files stay valid for
+clients that cached their URLs until they are pruned.
+"""
+
+import logging
+import time
+from pathlib import Path
+from django.conf import settings
+from . import metrics
+from .models import GenerationHistory
+from .utils import ModelCache
+
+
+logger = logging.getLogger(__name__)
+
+
+def stale_entries(generator_version: str):
+    """History rows produced by another generator version, hottest first."""
+    return (GenerationHistory.objects.exclude(generator_version=generator_version)
+            .order_by('-access_count', '-id'))
+
+
+def remove_artifact(model_file: str):
+    """Delete an artifact with its preview and derived exports."""
+    from .preview import get_preview_path
+
+    filepath = Path(settings.MEDIA_ROOT) / model_file
+    derived = filepath.parent / 'derived'
+    paths = [filepath, get_preview_path(filepath)]
+    paths += list(derived.glob(f'{filepath.stem}.*')) + list(derived.glob(f'{filepath.stem}_x*'))
+    for path in paths:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def regenerate_entry(history, generator_version: str, prune: bool = False) -> bool:
+    """
+    Build the current-version artifact for a stale row and switch the row to it.
+
+    Returns False if the row changed while the replacement was being built
+    (a request regenerated it first), in which case the row is left alone.
+    With ``prune``, the superseded artifact is deleted after the switch.
+    Raises GenerationError if the backend fell back, so fallback output never
+    replaces an artifact.
+    """
+    from .backends import GenerationError, generate_mesh
+    from .encoding import export_glb
+    from .preview import write_preview
+    from .shapes import flatten_geometry
+
+    filename = ModelCache.get_artifact_name(history.prompt_hash, generator_version)
+    filepath = Path(settings.MEDIA_ROOT) / filename
+    generation_time = history.generation_time
+
+    # A previous run may have written the file and stopped before the switch
+    if not filepath.exists():
+        start = time.time()
+        with metrics.time_stage('regenerate'):
+            mesh = generate_mesh(history.prompt)
+            produced_version = mesh.metadata.get('generator_version', generator_version)
+            if produced_version != generator_version:
+                raise GenerationError(f"Backend fell back to {produced_version}")
+            export_glb(mesh, filepath)
+        generation_time = time.time() - start
+        try:
+            write_preview(flatten_geometry(mesh), filepath)
+        except Exception as e:
+            logger.warning("Could not render preview for %s: %s", filename, e)
+
+    # Compare-and-swap, so a concurrent store_model() is never overwritten
+    updated = GenerationHistory.objects.filter(
+        pk=history.pk, model_file=history.model_file, generator_version=history.generator_version,
+    ).update(model_file=filename, generator_version=generator_version, generation_time=generation_time)
+    metrics.inc('vision3d_regenerations', {'result': 'replaced' if updated else 'skipped'})
+
+    if updated and prune and history.model_file != filename:
+        remove_artifact(history.model_file)
+    return bool(updated)
+
+
+def regenerate_stale(limit: int = None, prune: bool = False, delay: float = 0.0) -> dict:
+    """
+    Regenerate up to ``limit`` stale entries in order of access count.
+
+    A failing entry is counted and skipped, so one bad prompt does not stall
+    the rest. ``delay`` seconds are slept between entries to leave CPU for
+    request traffic. Failures and the pass totals are logged.
+
+    Returns counts of 'replaced', 'skipped' and 'failed' entries.
+    """
+    from .backends import get_generator_version
+
+    generator_version = get_generator_version()
+    entries = stale_entries(generator_version)
+    if limit is not None:
+        entries = entries[:limit]
+
+    counts = {'replaced': 0, 'skipped': 0, 'failed': 0}
+    for history in entries:
+        try:
+            replaced = regenerate_entry(history, generator_version, prune)
+            counts['replaced' if replaced else 'skipped'] += 1
+        except Exception as e:
+            counts['failed'] += 1
+            metrics.inc('vision3d_regenerations', {'result': 'failed'})
+            logger.warning("Failed to regenerate '%s': %s", history.prompt[:50], e)
+        if delay:
+            time.sleep(delay)
+    logger.info("Regenerated stale artifacts for %s: replaced %d, skipped %d, failed %d",
+                generator_version, counts['replaced'], counts['skipped'], counts['failed'])
+    return counts
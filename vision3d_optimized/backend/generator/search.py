@@ -0,0 +1,102 @@
+"""
+Full-text search over prompt history.
+
+On SQLite, prompts are indexed by the ``generator_prompt_fts`` FTS5 table
+(see migration 0002), so a search is an index lookup plus a ranked top-N
+instead of a ``LIKE '%...%'`` scan over every row. Other databases fall back
+to ``icontains``.
+"""
+
+import re
+from django.db import DatabaseError, connection
+from django.db.models import Q
+from .models import GenerationHistory
+
+
+FTS_TABLE = 'generator_prompt_fts'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_HASH_RE = re.compile(r'^[0-9a-f]{8,64}$')
+
+
+def fts_available() -> bool:
+    """Return True if the FTS5 prompt index exists in the default database."""
+    if connection.vendor != 'sqlite':
+        return False
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def hash_prefix_query(text: str):
+    """
+    Filter for prompt hashes starting with ``text``, or None if it is not hex.
+
+    A half-open range rather than ``startswith``: SQLite runs ``LIKE 'abc%'``
+    as a full scan, while the range uses the unique index on prompt_hash.
+    """
+    prefix = text.strip().lower()
+    if not _HASH_RE.match(prefix):
+        return None
+    return Q(prompt_hash__gte=prefix, prompt_hash__lt=prefix + 'g')
+
+
+def build_fts_query(text: str) -> str:
+    """
+    Turn free text into a safe FTS5 query.
+
+    Every word must match (implicit AND); the last word also matches as a
+    prefix so partially typed queries still find results.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return ''
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_prompt_ids(text: str, limit: int = 20) -> list:
+    """
+    Return ``(history_id, score)`` pairs for prompts matching ``text``.
+
+    Results are ordered best first; scores are BM25 (lower is better).
+    """
+    query = build_fts_query(text)
+    if not query:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, bm25({FTS_TABLE}) AS score FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s ORDER BY score LIMIT %s",
+            [query, limit],
+        )
+        return cursor.fetchall()
+
+
+def search_history(text: str, limit: int = 20) -> list:
+    """
+    Search generation history by prompt text or prompt hash prefix.
+
+    Returns a list of ``(GenerationHistory, score)`` pairs, best first.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    fields = ['id', 'prompt', 'prompt_hash', 'model_file', 'created_at', 'access_count']
+
+    by_hash = hash_prefix_query(text)
+    if by_hash is not None:
+        matches = GenerationHistory.objects.only(*fields).filter(by_hash).order_by('prompt_hash')[:limit]
+        if matches:
+            return [(history, 0.0) for history in matches]
+
+    if fts_available():
+        try:
+            ranked = search_prompt_ids(text, limit)
+        except DatabaseError:
+            ranked = None
+        if ranked is not None:
+            histories = GenerationHistory.objects.only(*fields).in_bulk([pk for pk, _ in ranked])
+            return [(histories[pk], score) for pk, score in ranked if pk in histories]
+
+    matches = GenerationHistory.objects.only(*fields).filter(prompt__icontains=text)[:limit]
+    return [(history, 0.0) for history in matches]
@@ -0,0 +1,237 @@
+"""
+Keyword-driven mesh builders shared by the generator backends.
+
+Composite models are scenes: each distinct part is one mesh, and repeated
+parts (wheels, arms, legs) are extra nodes with their own transform rather
+than extra copies of the geometry.
+"""
+
+import functools
+import numpy as np
+import trimesh
+
+
+# Bump whenever a builder or the color table changes what a prompt produces;
+# artifacts stored under an older version are regenerated in the background
+SHAPES_VERSION = 1
+
+
+def build_scene(parts: list) -> trimesh.Scene:
+    """
+    Assemble a composite model from shared part meshes.
+
+    Args:
+        parts: (name, mesh, transforms) tuples; each mesh is stored once and
+            instanced by one scene node per 4x4 transform
+
+    Returns:
+        Scene whose nodes reference the shared meshes; use
+        ``flatten_geometry`` where a single mesh is needed.
+    """
+    scene = trimesh.Scene()
+    for name, mesh, transforms in parts:
+        for i, transform in enumerate(transforms):
+            node = name if len(transforms) == 1 else f'{name}_{i}'
+            if i == 0:
+                scene.add_geometry(mesh, geom_name=name, node_name=node, transform=transform)
+            else:
+                scene.graph.update(frame_to=node, frame_from=scene.graph.base_frame,
+                                   matrix=transform, geometry=name)
+    return scene
+
+
+def flatten_geometry(geometry) -> trimesh.Trimesh:
+    """Return a single mesh, applying node transforms if given a scene."""
+    if isinstance(geometry, trimesh.Scene):
+        return geometry.to_mesh()
+    return geometry
+
+
+def _translate(offset) -> np.ndarray:
+    return trimesh.transformations.translation_matrix(offset)
+
+
+def _rotate(angle: float, axis) -> np.ndarray:
+    return trimesh.transformations.rotation_matrix(angle, axis)
+
+
+def create_robot_mesh() -> trimesh.Scene:
+    """Create a simple robot from instanced parts."""
+    # Body
+    body = trimesh.creation.box(extents=[1.5, 1.0, 2.0])
+    
+    # Head
+    head = trimesh.creation.box(extents=[1.0, 0.8, 0.8])
+    
+    # Arms (one horizontal cylinder, two nodes)
+    arm = trimesh.creation.cylinder(radius=0.2, height=1.5)
+    arm_rotation = _rotate(np.pi/2, [0, 1, 0])
+    
+    # Legs
+    leg = trimesh.creation.cylinder(radius=0.25, height=1.5)
+    
+    return build_scene([
+        ('body', body, [np.eye(4)]),
+        ('head', head, [_translate([0, 0, 1.4])]),
+        ('arm', arm, [_translate([x, 0, 0.5]) @ arm_rotation for x in (-1.0, 1.0)]),
+        ('leg', leg, [_translate([x, 0, -1.75]) for x in (-0.4, 0.4)]),
+    ])
+
+
+def create_car_mesh() -> trimesh.Scene:
+    """Create a simple car from instanced parts."""
+    # Car body (lower part)
+    body = trimesh.creation.box(extents=[4.0, 2.0, 1.0])
+    
+    # Car cabin (upper part)
+    cabin = trimesh.creation.box(extents=[2.0, 1.8, 1.0])
+    
+    # Wheels
+    wheel_radius = 0.4
+    wheel_height = 0.3
+    wheel = trimesh.creation.cylinder(radius=wheel_radius, height=wheel_height)
+    wheel_rotation = _rotate(np.pi/2, [1, 0, 0])
+    
+    wheel_positions = [
+        [-1.2, -1.0, 0],  # Front left
+        [-1.2, 1.0, 0],   # Front right
+        [1.2, -1.0, 0],   # Back left
+        [1.2, 1.0, 0]     # Back right
+    ]
+    
+    return build_scene([
+        ('body', body, [_translate([0, 0, 0.5])]),
+        ('cabin', cabin, [_translate([0, 0, 1.5])]),
+        ('wheel', wheel, [_translate(pos) @ wheel_rotation for pos in wheel_positions]),
+    ])
+
+
+def create_pendant_mesh() -> trimesh.Scene:
+    """Create a decorative pendant."""
+    # Main pendant body (teardrop shape)
+    pendant_body = trimesh.creation.icosphere(subdivisions=3, radius=1.0)
+    
+    # Scale to make it teardrop shaped
+    scale_matrix = np.eye(4)
+    scale_matrix[2, 2] = 1.5  # Stretch vertically
+    
+    # Add a loop at the top for hanging
+    loop = trimesh.creation.torus(major_radius=0.3, minor_radius=0.1)
+    
+    # Add decorative element (small sphere in center)
+    gem = trimesh.creation.icosphere(subdivisions=2, radius=0.3)
+    
+    return build_scene([
+        ('body', pendant_body, [scale_matrix]),
+        ('loop', loop, [_translate([0, 0, 1.5])]),
+        ('gem', gem, [np.eye(4)]),
+    ])
+
+
+def create_dragon_mesh() -> trimesh.Scene:
+    """Create a dragon-like model using multiple primitives."""
+    # Body
+    body = trimesh.creation.capsule(height=2.0, radius=0.5)
+    
+    # Head
+    head = trimesh.creation.icosphere(subdivisions=2, radius=0.6)
+    
+    # Tail
+    tail = trimesh.creation.cone(radius=0.3, height=1.5)
+    
+    return build_scene([
+        ('body', body, [np.eye(4)]),
+        ('head', head, [_translate([0, 0, 1.5])]),
+        ('tail', tail, [_translate([0, 0, -1.5])]),
+    ])
+
+
+def match_shape(prompt: str) -> str:
+    """Return the name of the shape template matching the prompt keywords."""
+    prompt_lower = prompt.lower()
+    
+    # Check for complex models first
+    if any(word in prompt_lower for word in ['robot', 'android', 'droid']):
+        return 'robot'
+    elif any(word in prompt_lower for word in ['car', 'vehicle', 'automobile']):
+        return 'car'
+    elif any(word in prompt_lower for word in ['pendant', 'necklace', 'jewelry', 'jewellery']):
+        return 'pendant'
+    elif any(word in prompt_lower for word in ['dragon', 'creature', 'animal']):
+        return 'dragon'
+    # Basic shapes
+    elif any(word in prompt_lower for word in ['cube', 'box', 'block']):
+        return 'cube'
+    elif any(word in prompt_lower for word in ['sphere', 'ball', 'globe']):
+        return 'sphere'
+    elif any(word in prompt_lower for word in ['cylinder', 'tube', 'pipe']):
+        return 'cylinder'
+    elif any(word in prompt_lower for word in ['cone', 'pyramid']):
+        return 'cone'
+    elif any(word in prompt_lower for word in ['torus', 'donut', 'ring']):
+        return 'torus'
+    # Default to a stylized shape
+    return 'default'
+
+
+SHAPE_BUILDERS = {
+    'robot': create_robot_mesh,
+    'car': create_car_mesh,
+    'pendant': create_pendant_mesh,
+    'dragon': create_dragon_mesh,
+    'cube': lambda: trimesh.creation.box(extents=[2, 2, 2]),
+    'sphere': lambda: trimesh.creation.icosphere(subdivisions=3, radius=1.0),
+    'cylinder': lambda: trimesh.creation.cylinder(radius=0.5, height=2.0),
+    'cone': lambda: trimesh.creation.cone(radius=1.0, height=2.0),
+    'torus': lambda: trimesh.creation.torus(major_radius=1.0, minor_radius=0.3),
+    'default': lambda: trimesh.creation.icosphere(subdivisions=2, radius=1.0),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_shape_template(shape: str):
+    """Build a shape once per process; callers must copy before modifying."""
+    return SHAPE_BUILDERS[shape]()
+
+
+def create_mesh_from_prompt(prompt: str):
+    """
+    Create a 3D mesh based on prompt analysis.
+    
+    Composite shapes come back as a Scene of instanced parts, primitives as
+    a single Trimesh.
+    """
+    mesh = get_shape_template(match_shape(prompt)).copy()
+    
+    # Apply color based on prompt (once per shared part for scenes)
+    color = extract_color_from_prompt(prompt.lower())
+    parts = mesh.geometry.values() if isinstance(mesh, trimesh.Scene) else [mesh]
+    for part in parts:
+        part.visual.vertex_colors = color
+    
+    return mesh
+
+
+def extract_color_from_prompt(prompt: str) -> list:
+    """Extract color from prompt or return default."""
+    color_map = {
+        'red': [255, 0, 0, 255],
+        'blue': [0, 0, 255, 255],
+        'green': [0, 255, 0, 255],
+        'yellow': [255, 255, 0, 255],
+        'purple': [128, 0, 128, 255],
+        'orange': [255, 165, 0, 255],
+        'pink': [255, 192, 203, 255],
+        'white': [255, 255, 255, 255],
+        'black': [0, 0, 0, 255],
+        'gray': [128, 128, 128, 255],
+        'gold': [255, 215, 0, 255],
+        'silver': [192, 192, 192, 255],
+    }
+    
+    for color_name, color_value in color_map.items():
+        if color_name in prompt:
+            return color_value
+    
+    # Default color (light blue)
+    return [100, 150, 255, 255]
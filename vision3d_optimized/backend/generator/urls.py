@@ -1,11 +1,17 @@
 """
 URL configuration for generator app.
 """
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 urlpatterns = [
     path('generate/', views.generate_model, name='generate_model'),
     path('stats/', views.performance_stats, name='performance_stats'),
+    path('history/', views.history_list, name='history_list'),
+    path('gallery/', views.history_list, {'default_ordering': 'popular'}, name='gallery'),
+    path('history/search/', views.search_history_view, name='search_history'),
+    path('models/<str:model_id>/preview/', views.model_preview, name='model_preview'),
+    re_path(r'^models/(?P<model_id>\w+)\.(?P<fmt>stl|3mf|obj)$', views.model_export, name='model_export'),
+    re_path(r'^models/(?P<model_id>\w+)$', views.model_result, name='model_result'),
     path('health/', views.health_check, name='health_check'),
 ]
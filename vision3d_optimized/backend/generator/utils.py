@@ -5,11 +5,11 @@ Includes caching, hash-based deduplication, and performance monitoring.
 
 import hashlib
 import time
-import trimesh
-import numpy as np
 from pathlib import Path
 from django.conf import settings
 from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
 from .models import GenerationHistory, PerformanceMetrics
 
 
@@ -24,6 +24,35 @@ class ModelCache:
         normalized = prompt.lower().strip()
         return hashlib.sha256(normalized.encode()).hexdigest()
     
+    @staticmethod
+    def get_artifact_name(prompt_hash: str, generator_version: str) -> str:
+        """
+        Artifact filename for a prompt under a generator version.
+        
+        Each version gets its own immutable file, so a regenerated model
+        never reuses a URL that clients may have cached.
+        """
+        tag = hashlib.sha256(generator_version.encode()).hexdigest()[:8]
+        return f"model_{prompt_hash[:12]}_{tag}.glb"
+    
+    @staticmethod
+    def get_legacy_artifact_name(prompt_hash: str) -> str:
+        """Artifact filename used before artifacts were versioned."""
+        return f"model_{prompt_hash[:12]}.glb"
+    
+    @staticmethod
+    def adopt_legacy_artifact(prompt: str, model_file: str):
+        """
+        Create the history row a pre-versioning artifact never got.
+        
+        The row has no generator version, so it is stale and
+        `manage.py regenerate_artifacts` replaces it like any other.
+        """
+        GenerationHistory.objects.get_or_create(
+            prompt_hash=ModelCache.get_prompt_hash(prompt),
+            defaults={'prompt': prompt, 'model_file': model_file, 'generation_time': 0.0},
+        )
+    
     @staticmethod
     def get_cached_model(prompt: str):
         """
@@ -61,7 +90,16 @@ class ModelCache:
             return None
     
     @staticmethod
-    def store_model(prompt: str, model_path: str, generation_time: float):
+    def record_access(prompt_hash: str):
+        """Bump the access count of a history entry with a single UPDATE."""
+        GenerationHistory.objects.filter(prompt_hash=prompt_hash).update(
+            access_count=F('access_count') + 1,
+            last_accessed=timezone.now(),
+        )
+    
+    @staticmethod
+    def store_model(prompt: str, model_path: str, generation_time: float,
+                    generator_version: str = ''):
         """Store generated model in cache and database."""
         prompt_hash = ModelCache.get_prompt_hash(prompt)
         
@@ -72,9 +110,15 @@ class ModelCache:
                 'prompt': prompt,
                 'model_file': model_path,
                 'generation_time': generation_time,
+                'generator_version': generator_version,
             }
         )
         
+        # Keep the approximate-match index current in this process
+        from .lsh import approximate_matching_enabled, get_prompt_index, sync_prompt_index
+        if approximate_matching_enabled():
+            sync_prompt_index(get_prompt_index(sync=False))
+        
         # Store in cache
         cache_key = f"model_{prompt_hash}"
         cache_data = {
@@ -95,104 +139,33 @@ class ModelGenerator:
         Generate a 3D model based on text prompt.
         Returns (model_path, generation_time).
         
-        This is a simplified implementation. In production, you would integrate
-        with actual AI models like Shap-E, Point-E, or other text-to-3D systems.
+        The mesh comes from the backend selected by GENERATOR_BACKEND, so heavier
+        text-to-3D models like Shap-E or Point-E can be plugged in there.
         """
+        from .backends import generate_mesh, get_generator_version
+        from .encoding import export_glb
+        
         start_time = time.time()
         
         # Create generated directory if it doesn't exist
         generated_dir = Path(settings.MEDIA_ROOT)
         generated_dir.mkdir(exist_ok=True)
         
-        # Generate unique filename
+        # Generate 3D mesh with the configured backend
+        mesh = generate_mesh(prompt)
+        
+        # Name the file after the version that produced it (fallback output included)
         prompt_hash = ModelCache.get_prompt_hash(prompt)
-        filename = f"model_{prompt_hash[:12]}.glb"
+        version = mesh.metadata.get('generator_version') or get_generator_version()
+        filename = ModelCache.get_artifact_name(prompt_hash, version)
         filepath = generated_dir / filename
         
-        # Generate 3D mesh based on prompt keywords
-        mesh = ModelGenerator._create_mesh_from_prompt(prompt)
-        
         # Export to GLB format
-        mesh.export(str(filepath))
+        export_glb(mesh, filepath)
         
         generation_time = time.time() - start_time
         
         return str(filename), generation_time
-    
-    @staticmethod
-    def _create_mesh_from_prompt(prompt: str) -> trimesh.Trimesh:
-        """
-        Create a 3D mesh based on prompt analysis.
-        This is a simplified version - in production, use actual AI models.
-        """
-        prompt_lower = prompt.lower()
-        
-        # Determine shape based on keywords
-        if any(word in prompt_lower for word in ['cube', 'box', 'block']):
-            mesh = trimesh.creation.box(extents=[2, 2, 2])
-        elif any(word in prompt_lower for word in ['sphere', 'ball', 'globe']):
-            mesh = trimesh.creation.icosphere(subdivisions=3, radius=1.0)
-        elif any(word in prompt_lower for word in ['cylinder', 'tube', 'pipe']):
-            mesh = trimesh.creation.cylinder(radius=0.5, height=2.0)
-        elif any(word in prompt_lower for word in ['cone', 'pyramid']):
-            mesh = trimesh.creation.cone(radius=1.0, height=2.0)
-        elif any(word in prompt_lower for word in ['torus', 'donut', 'ring']):
-            mesh = trimesh.creation.torus(major_radius=1.0, minor_radius=0.3)
-        elif any(word in prompt_lower for word in ['dragon', 'creature', 'animal']):
-            # Create a more complex shape for creatures
-            mesh = ModelGenerator._create_dragon_like_mesh()
-        else:
-            # Default to a stylized shape
-            mesh = trimesh.creation.icosphere(subdivisions=2, radius=1.0)
-        
-        # Apply color based on prompt
-        color = ModelGenerator._extract_color_from_prompt(prompt_lower)
-        mesh.visual.vertex_colors = color
-        
-        return mesh
-    
-    @staticmethod
-    def _create_dragon_like_mesh() -> trimesh.Trimesh:
-        """Create a dragon-like mesh using multiple primitives."""
-        # Body
-        body = trimesh.creation.capsule(height=2.0, radius=0.5)
-        
-        # Head
-        head = trimesh.creation.icosphere(subdivisions=2, radius=0.6)
-        head.apply_translation([0, 0, 1.5])
-        
-        # Tail
-        tail = trimesh.creation.cone(radius=0.3, height=1.5)
-        tail.apply_translation([0, 0, -1.5])
-        
-        # Combine meshes
-        combined = trimesh.util.concatenate([body, head, tail])
-        return combined
-    
-    @staticmethod
-    def _extract_color_from_prompt(prompt: str) -> list:
-        """Extract color from prompt or return default."""
-        color_map = {
-            'red': [255, 0, 0, 255],
-            'blue': [0, 0, 255, 255],
-            'green': [0, 255, 0, 255],
-            'yellow': [255, 255, 0, 255],
-            'purple': [128, 0, 128, 255],
-            'orange': [255, 165, 0, 255],
-            'pink': [255, 192, 203, 255],
-            'white': [255, 255, 255, 255],
-            'black': [0, 0, 0, 255],
-            'gray': [128, 128, 128, 255],
-            'gold': [255, 215, 0, 255],
-            'silver': [192, 192, 192, 255],
-        }
-        
-        for color_name, color_value in color_map.items():
-            if color_name in prompt:
-                return color_value
-        
-        # Default color (light blue)
-        return [100, 150, 255, 255]
 
 
 class PerformanceMonitor:
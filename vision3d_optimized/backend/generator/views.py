@@ -5,14 +5,35 @@ API Views for 3D model generation with optimization and 3D printing parameters.
 import time
 import hashlib
 import uuid
-import trimesh
-import numpy as np
 from pathlib import Path
+from urllib.parse import urlencode
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.views.static import serve
+from . import metrics
+from .admission import AdmissionRejected, get_admission_controller
+from .memory import MemoryBudgetExceeded, memory_percentiles, track_memory
+from .models import GenerationHistory
+from .pagination import InvalidCursor, paginate_history
+from .search import search_history
+from .utils import ModelCache
+
+# trimesh, numpy and the generation modules that use them are imported inside
+# the views so URL loading (every worker and manage.py command) stays cheap;
+# serving processes preload them in generator.warmup.
+
+# Artifact names are derived from the prompt hash and generator version, so
+# their content never changes
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# A full prompt hash follows the prompt to whatever artifact regeneration
+# last switched it to, so responses for it must be revalidated
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'
 
 
 def get_prompt_hash(prompt: str) -> str:
@@ -21,168 +42,120 @@ def get_prompt_hash(prompt: str) -> str:
     return hashlib.sha256(normalized.encode()).hexdigest()
 
 
-def create_robot_mesh() -> trimesh.Trimesh:
-    """Create a simple robot mesh."""
-    # Body
-    body = trimesh.creation.box(extents=[1.5, 1.0, 2.0])
-    
-    # Head
-    head = trimesh.creation.box(extents=[1.0, 0.8, 0.8])
-    head.apply_translation([0, 0, 1.4])
-    
-    # Arms
-    left_arm = trimesh.creation.cylinder(radius=0.2, height=1.5)
-    left_arm.apply_transform(trimesh.transformations.rotation_matrix(np.pi/2, [0, 1, 0]))
-    left_arm.apply_translation([-1.0, 0, 0.5])
-    
-    right_arm = trimesh.creation.cylinder(radius=0.2, height=1.5)
-    right_arm.apply_transform(trimesh.transformations.rotation_matrix(np.pi/2, [0, 1, 0]))
-    right_arm.apply_translation([1.0, 0, 0.5])
-    
-    # Legs
-    left_leg = trimesh.creation.cylinder(radius=0.25, height=1.5)
-    left_leg.apply_translation([-0.4, 0, -1.75])
-    
-    right_leg = trimesh.creation.cylinder(radius=0.25, height=1.5)
-    right_leg.apply_translation([0.4, 0, -1.75])
-    
-    # Combine all parts
-    robot = trimesh.util.concatenate([body, head, left_arm, right_arm, left_leg, right_leg])
-    return robot
+def get_preview_url(model_file: str) -> str:
+    """URL of the preview thumbnail for a stored artifact."""
+    model_id = Path(model_file).stem.replace('model_', '', 1)
+    return f'/api/models/{model_id}/preview/'
 
 
-def create_car_mesh() -> trimesh.Trimesh:
-    """Create a simple car mesh."""
-    # Car body (lower part)
-    body = trimesh.creation.box(extents=[4.0, 2.0, 1.0])
-    body.apply_translation([0, 0, 0.5])
-    
-    # Car cabin (upper part)
-    cabin = trimesh.creation.box(extents=[2.0, 1.8, 1.0])
-    cabin.apply_translation([0, 0, 1.5])
-    
-    # Wheels
-    wheel_radius = 0.4
-    wheel_height = 0.3
+def get_mesh_aggregates(mesh: 'trimesh.Trimesh', artifact_key: str = None) -> dict:
+    """
+    Unscaled mesh totals that print analysis is derived from.
     
-    wheels = []
-    wheel_positions = [
-        [-1.2, -1.0, 0],  # Front left
-        [-1.2, 1.0, 0],   # Front right
-        [1.2, -1.0, 0],   # Back left
-        [1.2, 1.0, 0]     # Back right
-    ]
+    Mesh units are millimetres at scale 1. Under a uniform scale s, volume,
+    area and height change as s³, s² and s, and so do the support volume and
+    contact area; face count does not, so any print size is computed from
+    these alone.
+    """
+    from .volume import estimate_supports, get_artifact_volume
     
-    for pos in wheel_positions:
-        wheel = trimesh.creation.cylinder(radius=wheel_radius, height=wheel_height)
-        wheel.apply_transform(trimesh.transformations.rotation_matrix(np.pi/2, [1, 0, 0]))
-        wheel.apply_translation(pos)
-        wheels.append(wheel)
-    
-    # Combine all parts
-    car = trimesh.util.concatenate([body, cabin] + wheels)
-    return car
-
-
-def create_pendant_mesh() -> trimesh.Trimesh:
-    """Create a decorative pendant mesh."""
-    # Main pendant body (teardrop shape)
-    pendant_body = trimesh.creation.icosphere(subdivisions=3, radius=1.0)
-    
-    # Scale to make it teardrop shaped
-    scale_matrix = np.eye(4)
-    scale_matrix[2, 2] = 1.5  # Stretch vertically
-    pendant_body.apply_transform(scale_matrix)
-    
-    # Add a loop at the top for hanging
-    loop = trimesh.creation.torus(major_radius=0.3, minor_radius=0.1)
-    loop.apply_translation([0, 0, 1.5])
-    
-    # Add decorative element (small sphere in center)
-    gem = trimesh.creation.icosphere(subdivisions=2, radius=0.3)
-    
-    # Combine parts
-    pendant = trimesh.util.concatenate([pendant_body, loop, gem])
-    return pendant
-
-
-def create_mesh_from_prompt(prompt: str) -> trimesh.Trimesh:
-    """
-    Create a 3D mesh based on prompt analysis.
-    """
-    prompt_lower = prompt.lower()
-    
-    # Check for complex models first
-    if any(word in prompt_lower for word in ['robot', 'android', 'droid']):
-        mesh = create_robot_mesh()
-    elif any(word in prompt_lower for word in ['car', 'vehicle', 'automobile']):
-        mesh = create_car_mesh()
-    elif any(word in prompt_lower for word in ['pendant', 'necklace', 'jewelry', 'jewellery']):
-        mesh = create_pendant_mesh()
-    # Basic shapes
-    elif any(word in prompt_lower for word in ['cube', 'box', 'block']):
-        mesh = trimesh.creation.box(extents=[2, 2, 2])
-    elif any(word in prompt_lower for word in ['sphere', 'ball', 'globe']):
-        mesh = trimesh.creation.icosphere(subdivisions=3, radius=1.0)
-    elif any(word in prompt_lower for word in ['cylinder', 'tube', 'pipe']):
-        mesh = trimesh.creation.cylinder(radius=0.5, height=2.0)
-    elif any(word in prompt_lower for word in ['cone', 'pyramid']):
-        mesh = trimesh.creation.cone(radius=1.0, height=2.0)
-    elif any(word in prompt_lower for word in ['torus', 'donut', 'ring']):
-        mesh = trimesh.creation.torus(major_radius=1.0, minor_radius=0.3)
-    else:
-        # Default to a stylized shape
-        mesh = trimesh.creation.icosphere(subdivisions=2, radius=1.0)
-    
-    # Apply color based on prompt
-    color = extract_color_from_prompt(prompt_lower)
-    mesh.visual.vertex_colors = color
-    
-    return mesh
-
-
-def extract_color_from_prompt(prompt: str) -> list:
-    """Extract color from prompt or return default."""
-    color_map = {
-        'red': [255, 0, 0, 255],
-        'blue': [0, 0, 255, 255],
-        'green': [0, 255, 0, 255],
-        'yellow': [255, 255, 0, 255],
-        'purple': [128, 0, 128, 255],
-        'orange': [255, 165, 0, 255],
-        'pink': [255, 192, 203, 255],
-        'white': [255, 255, 255, 255],
-        'black': [0, 0, 0, 255],
-        'gray': [128, 128, 128, 255],
-        'gold': [255, 215, 0, 255],
-        'silver': [192, 192, 192, 255],
+    with metrics.time_stage('support_analysis'):
+        supports = estimate_supports(mesh)
+    return {
+        # Composite meshes overlap, so mesh.volume would double-count shared regions
+        'volume': get_artifact_volume(mesh, artifact_key),
+        'area': float(mesh.area),
+        'extents': [float(e) for e in mesh.extents],
+        'face_count': int(len(mesh.faces)),
+        'support_volume': supports['volume'],
+        'support_contact_area': supports['contact_area'],
     }
+
+
+def get_print_aggregates(artifact_key: str, load_mesh) -> dict:
+    """
+    Return the mesh aggregates of a stored artifact, cached per artifact.
     
-    for color_name, color_value in color_map.items():
-        if color_name in prompt:
-            return color_value
+    ``load_mesh`` is only called on a cache miss, so re-targeting a cached
+    model to another size never loads the GLB.
+    """
+    from .volume import get_support_resolution, get_volume_resolution
+    
+    cache_key = (f"print_aggregates_{artifact_key}_{get_volume_resolution()}_"
+                 f"{get_support_resolution()}_{getattr(settings, 'SUPPORT_OVERHANG_ANGLE', 45)}")
+    aggregates = cache.get(cache_key)
+    metrics.inc('vision3d_cache_requests',
+                {'tier': 'print_aggregates', 'result': 'miss' if aggregates is None else 'hit'})
+    if aggregates is None:
+        aggregates = get_mesh_aggregates(load_mesh(), artifact_key)
+        cache.set(cache_key, aggregates, timeout=settings.CACHE_TIMEOUT)
+    return aggregates
+
+
+def parse_scale_options(params) -> tuple:
+    """
+    Read ``scale`` and ``target_height_mm`` from request data.
     
-    # Default color (light blue)
-    return [100, 150, 255, 255]
+    Raises ValueError for non-numeric or out-of-range values.
+    """
+    scale = params.get('scale')
+    scale = float(scale) if scale not in (None, '') else 1.0
+    target_height_mm = params.get('target_height_mm')
+    target_height_mm = float(target_height_mm) if target_height_mm not in (None, '') else None
+    if not 0 < scale <= 1000 or (target_height_mm is not None and not 0 < target_height_mm <= 10000):
+        raise ValueError("scale must be in (0, 1000] and target_height_mm in (0, 10000]")
+    return scale, target_height_mm
+
+
+def parse_flag(params, name: str, default: bool) -> bool:
+    """
+    Read a boolean option sent as JSON or as form/query text.
+
+    Raises ValueError for anything but true/false, 1/0, yes/no or on/off.
+    """
+    value = params.get(name)
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('true', '1', 'yes', 'on'):
+        return True
+    if text in ('false', '0', 'no', 'off'):
+        return False
+    raise ValueError(f"{name} must be true or false")
 
 
-def calculate_print_parameters(mesh: trimesh.Trimesh, layer_height: float = 0.2, 
-                               infill_density: float = 20.0) -> dict:
+def calculate_print_parameters(mesh: 'trimesh.Trimesh', layer_height: float = 0.2, 
+                               infill_density: float = 20.0, artifact_key: str = None,
+                               scale: float = 1.0, target_height_mm: float = None,
+                               aggregates: dict = None) -> dict:
     """
     Calculate 3D printing parameters for the mesh.
     
     Args:
-        mesh: The 3D mesh to analyze
+        mesh: The 3D mesh to analyze (unused if aggregates are given)
         layer_height: Layer height in mm (0.1-0.3mm typical)
         infill_density: Infill percentage (0-100%)
+        artifact_key: Identifier of the stored artifact, used to cache the volume
+        scale: Uniform scale from mesh units to millimetres
+        target_height_mm: Print height; overrides scale when given
+        aggregates: Precomputed get_mesh_aggregates() result
     
     Returns:
         Dictionary with printing parameters
     """
-    # Get mesh properties
-    volume_cm3 = mesh.volume / 1000  # Convert mm³ to cm³
-    height_mm = mesh.bounds[1][2] - mesh.bounds[0][2]
-    surface_area_cm2 = mesh.area / 100  # Convert mm² to cm²
+    if aggregates is None:
+        aggregates = get_mesh_aggregates(mesh, artifact_key)
+    
+    unscaled_height = aggregates['extents'][2]
+    if target_height_mm is not None and unscaled_height > 0:
+        scale = target_height_mm / unscaled_height
+    
+    # Get mesh properties, rescaled analytically
+    volume_cm3 = aggregates['volume'] * scale ** 3 / 1000  # Convert mm³ to cm³
+    height_mm = unscaled_height * scale
+    surface_area_cm2 = aggregates['area'] * scale ** 2 / 100  # Convert mm² to cm²
     
     # Calculate number of layers
     num_layers = int(height_mm / layer_height)
@@ -195,19 +168,28 @@ def calculate_print_parameters(mesh: trimesh.Trimesh, layer_height: float = 0.2,
     # Shell volume (approximate)
     shell_volume_cm3 = surface_area_cm2 * (wall_thickness_mm / 10)
     
+    # Walls cannot hold more material than the model itself (small prints)
+    shell_volume_cm3 = min(shell_volume_cm3, volume_cm3)
+    
     # Infill volume
     infill_volume_cm3 = (volume_cm3 - shell_volume_cm3) * (infill_density / 100)
     
     # Total material
     total_material_cm3 = shell_volume_cm3 + infill_volume_cm3
     
+    # Supports are printed as a sparse lattice under each overhang
+    support_volume_cm3 = aggregates['support_volume'] * scale ** 3 / 1000
+    support_material_cm3 = support_volume_cm3 * getattr(settings, 'SUPPORT_DENSITY', 0.15)
+    support_contact_area_cm2 = aggregates['support_contact_area'] * scale ** 2 / 100
+    
     # Material weight (PLA density ~1.24 g/cm³)
-    material_weight_g = total_material_cm3 * 1.24
+    support_weight_g = support_material_cm3 * 1.24
+    material_weight_g = total_material_cm3 * 1.24 + support_weight_g
     
     # Print time estimation (very rough)
     # Based on layer count and complexity
     base_time_per_layer = 2.0  # minutes per layer (average)
-    complexity_factor = 1.0 + (mesh.faces.shape[0] / 1000) * 0.1
+    complexity_factor = 1.0 + (aggregates['face_count'] / 1000) * 0.1
     print_time_minutes = num_layers * base_time_per_layer * complexity_factor
     print_time_hours = print_time_minutes / 60
     
@@ -215,13 +197,8 @@ def calculate_print_parameters(mesh: trimesh.Trimesh, layer_height: float = 0.2,
     # PLA filament cost: ~$20/kg = $0.02/g
     material_cost = material_weight_g * 0.02
     
-    # Determine if supports are needed (check for overhangs)
-    # Simple heuristic: if mesh has significant negative Z normals
-    needs_supports = False
-    if hasattr(mesh, 'face_normals'):
-        downward_faces = np.sum(mesh.face_normals[:, 2] < -0.5)
-        if downward_faces > len(mesh.face_normals) * 0.1:  # More than 10% facing down
-            needs_supports = True
+    # Supports are needed wherever an overhang has no surface right below it
+    needs_supports = support_contact_area_cm2 > 0
     
     # Determine optimal orientation
     # Best orientation typically has largest base area
@@ -250,13 +227,72 @@ def calculate_print_parameters(mesh: trimesh.Trimesh, layer_height: float = 0.2,
         'wall_thickness_mm': round(wall_thickness_mm, 2),
         'supports_needed': needs_supports,
         'support_type': 'Auto-generated tree supports' if needs_supports else 'None required',
+        'support_volume_cm3': round(support_volume_cm3, 2),
+        'support_weight_g': round(support_weight_g, 2),
+        'support_contact_area_cm2': round(support_contact_area_cm2, 2),
         'orientation': orientation,
         'print_time_hours': round(print_time_hours, 2),
         'print_time_minutes': round(print_time_minutes, 1),
         'material_weight_g': round(material_weight_g, 2),
         'material_cost_usd': round(material_cost, 2),
         'model_volume_cm3': round(volume_cm3, 2),
-        'model_height_mm': round(height_mm, 2)
+        'model_height_mm': round(height_mm, 2),
+        'model_dimensions_mm': [round(e * scale, 2) for e in aggregates['extents']],
+        'scale': round(scale, 6),
+    }
+
+
+def load_artifact(filepath: Path) -> 'trimesh.Trimesh':
+    """Load a stored GLB artifact as a single mesh."""
+    import trimesh
+    
+    with metrics.time_stage('load'):
+        return trimesh.load(str(filepath), force='mesh')
+
+
+def find_approximate_match(prompt: str, generated_dir: Path):
+    """
+    Look up the nearest cached prompt in the MinHash LSH index.
+    
+    Returns (GenerationHistory, similarity) if its artifact is still on disk.
+    """
+    from .lsh import find_similar_prompt
+    
+    with metrics.time_stage('approximate_lookup'):
+        match = find_similar_prompt(prompt)
+    if match and not (generated_dir / match[0].model_file).exists():
+        match = None
+    metrics.inc('vision3d_cache_requests',
+                {'tier': 'approximate', 'result': 'hit' if match else 'miss'})
+    return match
+
+
+def find_stale_artifact(prompt_hash: str, generated_dir: Path):
+    """
+    Artifact recorded for a prompt under an older generator version.
+    
+    Prompts generated before history was recorded have no row; their
+    artifact is found under the legacy unversioned name. Returns the
+    filename if it is still on disk, else None.
+    """
+    model_file = (GenerationHistory.objects.filter(prompt_hash=prompt_hash)
+                  .values_list('model_file', flat=True).first())
+    if model_file is None:
+        model_file = ModelCache.get_legacy_artifact_name(prompt_hash)
+    if (generated_dir / model_file).exists():
+        return model_file
+    return None
+
+
+def history_item(history) -> dict:
+    """Listing representation of a GenerationHistory row."""
+    return {
+        'prompt': history.prompt,
+        'prompt_hash': history.prompt_hash,
+        'model_url': f'/generated/{history.model_file}',
+        'preview_url': get_preview_url(history.model_file),
+        'access_count': history.access_count,
+        'created_at': history.created_at,
     }
 
 
@@ -266,12 +302,24 @@ def generate_model(request):
     """
     Generate a 3D model from text prompt with caching optimization and print parameters.
     """
+    from .backends import generate_mesh, get_generator_version
+    from .encoding import export_glb
+    from .lsh import approximate_matching_enabled
+    from .preview import write_preview
+    from .shapes import flatten_geometry
+    
     request_start = time.time()
     
     # Get prompt and print settings from request
     prompt = request.data.get('prompt', '').strip()
-    layer_height = float(request.data.get('layer_height', 0.2))
-    infill_density = float(request.data.get('infill_density', 20.0))
+    try:
+        layer_height = float(request.data.get('layer_height', 0.2))
+        infill_density = float(request.data.get('infill_density', 20.0))
+        scale, target_height_mm = parse_scale_options(request.data)
+        # Approximate matching is opt-in via settings; a request may still ask for exact
+        use_approximate = approximate_matching_enabled() and parse_flag(request.data, 'approximate', True)
+    except (TypeError, ValueError) as e:
+        return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
     if not prompt:
         return Response(
@@ -284,42 +332,141 @@ def generate_model(request):
         generated_dir = Path(settings.MEDIA_ROOT)
         generated_dir.mkdir(exist_ok=True)
         
-        # Generate unique filename
+        # Artifacts are named by prompt and generator version
         prompt_hash = get_prompt_hash(prompt)
-        filename = f"model_{prompt_hash[:12]}.glb"
+        generator_version = get_generator_version()
+        filename = ModelCache.get_artifact_name(prompt_hash, generator_version)
         filepath = generated_dir / filename
         
+        # An artifact from an older generator version keeps being served
+        # until `manage.py regenerate_artifacts` replaces it
+        stale_file = None
+        if not filepath.exists():
+            stale_file = find_stale_artifact(prompt_hash, generated_dir)
+        
+        approximate_match = None
+        if not filepath.exists() and stale_file is None and use_approximate:
+            approximate_match = find_approximate_match(prompt, generated_dir)
+        
+        # Cached artifacts are only loaded if their print aggregates are not cached
+        mesh = None
+        stale = False
+        
         # Check if model already exists (simple file-based caching)
         if filepath.exists():
             generation_time = 0.0
             cached = True
-            # Load existing mesh for parameter calculation
-            mesh = trimesh.load(str(filepath))
+        elif stale_file:
+            if stale_file == ModelCache.get_legacy_artifact_name(prompt_hash):
+                # Give it a history row so access counts and regeneration see it
+                ModelCache.adopt_legacy_artifact(prompt, stale_file)
+            filename = stale_file
+            filepath = generated_dir / filename
+            generation_time = 0.0
+            cached = stale = True
+        elif approximate_match:
+            # Serve the nearest cached prompt's artifact instead of generating
+            history, similarity = approximate_match
+            prompt_hash = history.prompt_hash
+            filename = history.model_file
+            filepath = generated_dir / filename
+            generation_time = 0.0
+            cached = True
+        else:
+            # Cache misses go through admission control; hits never wait here
+            with get_admission_controller().admit():
+                if filepath.exists():
+                    # Generated by another request while this one was queued
+                    generation_time = 0.0
+                    cached = True
+                else:
+                    # Generate 3D mesh with the configured backend
+                    gen_start = time.time()
+                    with metrics.time_stage('generate'):
+                        mesh = generate_mesh(prompt)
+                    
+                    # Fallback output is stored under the fallback's version,
+                    # so later requests treat it as stale and it gets regenerated
+                    produced_version = mesh.metadata.get('generator_version', generator_version)
+                    if produced_version != generator_version:
+                        generator_version = produced_version
+                        filename = ModelCache.get_artifact_name(prompt_hash, generator_version)
+                        filepath = generated_dir / filename
+                    
+                    # Export to GLB format
+                    with metrics.time_stage('export'), track_memory('export'):
+                        export_glb(mesh, filepath)
+                    generation_time = time.time() - gen_start
+                    
+                    # Composites are instanced scenes; analysis needs the flattened geometry
+                    mesh = flatten_geometry(mesh)
+                    
+                    # Thumbnail for history/gallery views; missing ones are backfilled lazily
+                    try:
+                        with metrics.time_stage('preview'):
+                            write_preview(mesh, filepath)
+                    except Exception as e:
+                        print(f"Error rendering preview: {e}")
+                    cached = False
+        metrics.inc('vision3d_cache_requests', {
+            'tier': 'artifact',
+            'result': 'stale' if stale else 'hit' if cached else 'miss',
+        })
+        
+        # Record generation history (also feeds the prompt search index)
+        if cached:
+            ModelCache.record_access(prompt_hash)
         else:
-            # Generate 3D mesh based on prompt keywords
-            gen_start = time.time()
-            mesh = create_mesh_from_prompt(prompt)
-            
-            # Export to GLB format
-            mesh.export(str(filepath))
-            generation_time = time.time() - gen_start
-            cached = False
+            ModelCache.store_model(prompt, filename, generation_time, generator_version)
         
-        # Calculate 3D printing parameters
-        print_params = calculate_print_parameters(mesh, layer_height, infill_density)
+        # Calculate 3D printing parameters, cached per artifact (and so per version)
+        aggregates = get_print_aggregates(
+            filepath.stem, lambda: mesh if mesh is not None else load_artifact(filepath)
+        )
+        with metrics.time_stage('print_analysis'):
+            print_params = calculate_print_parameters(
+                None, layer_height, infill_density, scale=scale,
+                target_height_mm=target_height_mm, aggregates=aggregates
+            )
+        result_query = {'layer_height': f'{layer_height:g}', 'infill': f'{infill_density:g}'}
+        if target_height_mm is not None:
+            result_query['target_height_mm'] = f'{target_height_mm:g}'
+        elif scale != 1.0:
+            result_query['scale'] = f'{scale:g}'
         
         response_time = time.time() - request_start
         
         return Response({
             'success': True,
             'model_url': f'/generated/{filename}',
+            'preview_url': get_preview_url(filename),
+            'result_url': f'/api/models/{filepath.stem[len("model_"):]}?{urlencode(result_query)}',
             'cached': cached,
+            'stale': stale,
             'generation_time': generation_time,
             'response_time': response_time,
             'cache_hit': cached,
+            'approximate_match': {
+                'prompt': approximate_match[0].prompt,
+                'similarity': round(approximate_match[1], 3),
+            } if approximate_match else None,
             'print_parameters': print_params
         })
     
+    except AdmissionRejected as e:
+        return Response(
+            {'success': False, 'error': str(e), 'retry_after': e.retry_after},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': str(e.retry_after)}
+        )
+    
+    except MemoryBudgetExceeded as e:
+        # GENERATION_MEMORY_POLICY = 'abort', or no fallback to reroute to
+        return Response(
+            {'success': False, 'error': str(e), 'code': 'memory_budget_exceeded'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    
     except Exception as e:
         print(f"Error generating model: {e}")
         import traceback
@@ -339,10 +486,271 @@ def performance_stats(request):
         'cache_hit_rate': '0.00%',
         'cached_avg_response': '0.000s',
         'non_cached_avg_response': '0.000s',
+        'admission': get_admission_controller().stats(),
+        'memory': memory_percentiles(),
+    })
+
+
+@api_view(['GET'])
+def search_history_view(request):
+    """
+    Ranked full-text search over prompt history.
+    
+    Query params: q (search text or prompt hash prefix), limit (max 100).
+    """
+    query = request.query_params.get('q', '').strip()
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+    
+    if not query:
+        return Response(
+            {'success': False, 'error': 'Query parameter q is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    results = [
+        dict(history_item(history), score=score)
+        for history, score in search_history(query, limit)
+    ]
+    return Response({'success': True, 'query': query, 'results': results})
+
+
+@api_view(['GET'])
+def history_list(request, default_ordering='recent'):
+    """
+    Keyset-paginated listing of recent or popular generations.
+    
+    Query params: order (recent|popular), cursor (from next_cursor), limit (max 100).
+    Responses carry an ETag; a matching If-None-Match returns 304.
+    """
+    ordering = request.query_params.get('order', default_ordering)
+    cursor = request.query_params.get('cursor') or None
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+    
+    try:
+        rows, next_cursor = paginate_history(ordering, cursor, limit)
+    except InvalidCursor as e:
+        return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # The page is identified by its rows, counters and artifacts; unchanged pages revalidate
+    fingerprint = ';'.join(f'{h.id}:{h.access_count}:{h.model_file}' for h in rows) + f'|{next_cursor}'
+    etag = quote_etag(hashlib.sha1(fingerprint.encode()).hexdigest()[:20])
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+    
+    response = Response({
+        'success': True,
+        'order': ordering,
+        'results': [history_item(history) for history in rows],
+        'next_cursor': next_cursor,
+    })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def get_artifact_path(model_id: str) -> Path:
+    """
+    Resolve a model id (the part after ``model_`` in the artifact name) to a
+    stored artifact.
+    
+    A full prompt hash is accepted too and resolves to the prompt's current
+    artifact. Raises Http404 if the file is missing.
+    """
+    model_id = model_id.lower()
+    if not model_id.replace('_', '', 1).isalnum():
+        raise Http404("Unknown model")
+    generated_dir = Path(settings.MEDIA_ROOT)
+    if len(model_id) == 64:
+        model_file = (GenerationHistory.objects.filter(prompt_hash=model_id)
+                      .values_list('model_file', flat=True).first())
+        filepath = generated_dir / (model_file or ModelCache.get_legacy_artifact_name(model_id))
+    else:
+        filepath = generated_dir / f"model_{model_id}.glb"
+    if not filepath.exists():
+        raise Http404("Unknown model")
+    return filepath
+
+
+def get_artifact_cache_headers(request, model_id: str, path: Path):
+    """
+    Caching headers for a file served under a model id.
+    
+    Model ids name immutable artifacts. A full prompt hash gets an ETag of
+    the served file and must be revalidated; returns (headers, response),
+    where response is a 304 if the client's copy is current, else None.
+    """
+    if len(model_id) != 64:
+        return {'Cache-Control': IMMUTABLE_CACHE_CONTROL}, None
+    stat = path.stat()
+    fingerprint = f'{path.name}:{stat.st_size}:{stat.st_mtime_ns}'
+    headers = {
+        'ETag': quote_etag(hashlib.sha256(fingerprint.encode()).hexdigest()[:32]),
+        'Cache-Control': REVALIDATE_CACHE_CONTROL,
+    }
+    not_modified = get_conditional_response(request, etag=headers['ETag'])
+    if not_modified is not None:
+        for name, value in headers.items():
+            not_modified[name] = value
+    return headers, not_modified
+
+
+@api_view(['GET'])
+def model_result(request, model_id):
+    """
+    Cacheable GET of a generated model and its print parameters.
+    
+    Keyed by model id (or prompt hash) and the print settings in the query
+    string (layer_height, infill, scale or target_height_mm). The body depends only on those and the
+    stored artifact, so it carries a strong ETag and can be served by a
+    caching proxy. A model id names one immutable artifact and gets a long
+    public max-age; a full prompt hash follows the prompt to its current
+    artifact, which regeneration can replace, so it must be revalidated.
+    Unknown ids return 404; POST the prompt to /api/generate/ first.
+    """
+    filepath = get_artifact_path(model_id)
+    try:
+        layer_height = round(float(request.query_params.get('layer_height', 0.2)), 3)
+        infill_density = round(float(request.query_params.get('infill', 20.0)), 1)
+    except ValueError:
+        layer_height = infill_density = -1.0
+    if not (0.01 <= layer_height <= 1.0 and 0.0 <= infill_density <= 100.0):
+        return Response(
+            {'success': False, 'error': 'layer_height must be 0.01-1.0 and infill 0-100'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        scale, target_height_mm = parse_scale_options(request.query_params)
+    except ValueError as e:
+        return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Hex range instead of startswith, so short ids still use the unique index;
+    # versioned ids are the hash prefix plus a version tag
+    hash_prefix = model_id.lower().split('_')[0]
+    history = (GenerationHistory.objects.only('prompt', 'prompt_hash')
+               .filter(prompt_hash__gte=hash_prefix, prompt_hash__lt=hash_prefix + 'g')
+               .order_by('prompt_hash').first())
+    prompt_hash = history.prompt_hash if history else hash_prefix
+    
+    # The ETag is derived from the inputs, so revalidation never loads the mesh
+    artifact = filepath.stat()
+    fingerprint = (f'{filepath.name}:{artifact.st_size}:{artifact.st_mtime_ns}:'
+                   f'{layer_height}:{infill_density}:{scale!r}:{target_height_mm!r}')
+    etag = quote_etag(hashlib.sha256(fingerprint.encode()).hexdigest()[:32])
+    if len(model_id) == 64:
+        cache_control = REVALIDATE_CACHE_CONTROL
+    else:
+        cache_control = f"public, max-age={int(getattr(settings, 'RESULT_CACHE_MAX_AGE', 604800))}"
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        not_modified['Cache-Control'] = cache_control
+        return not_modified
+    
+    aggregates = get_print_aggregates(filepath.stem, lambda: load_artifact(filepath))
+    with metrics.time_stage('print_analysis'):
+        print_params = calculate_print_parameters(
+            None, layer_height, infill_density, scale=scale,
+            target_height_mm=target_height_mm, aggregates=aggregates
+        )
+    
+    response = Response({
+        'success': True,
+        'prompt': history.prompt if history else None,
+        'prompt_hash': prompt_hash,
+        'model_url': f'/generated/{filepath.name}',
+        'preview_url': get_preview_url(filepath.name),
+        'print_parameters': print_params,
     })
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def model_export(request, model_id, fmt):
+    """
+    Download an artifact as binary STL, 3MF or OBJ.
+    
+    Query params: scale (uniform scale factor, default 1, rounded to four
+    decimals). Converted files are cached per (artifact, format, scale) and
+    served as immutable, except under a full prompt hash (see
+    get_artifact_cache_headers).
+    """
+    from .exports import EXPORT_FORMATS, get_derived_artifact, normalize_scale
+    
+    if fmt not in EXPORT_FORMATS:
+        raise Http404("Unknown format")
+    filepath = get_artifact_path(model_id)
+    try:
+        scale = normalize_scale(request.GET.get('scale', 1.0))
+    except ValueError:
+        scale = 0.0
+    if not 0.01 <= scale <= 100:
+        return HttpResponse("scale must be between 0.01 and 100", status=400)
+    
+    derived_path = get_derived_artifact(filepath, fmt, scale)
+    headers, not_modified = get_artifact_cache_headers(request, model_id, derived_path)
+    if not_modified is not None:
+        return not_modified
+    response = FileResponse(open(derived_path, 'rb'), content_type=EXPORT_FORMATS[fmt][1],
+                            as_attachment=True, filename=derived_path.name)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def model_preview(request, model_id):
+    """
+    Serve the preview thumbnail of an artifact, rendering it on first request.
+    
+    Artifacts generated before previews existed are backfilled here, so the
+    cost is paid once per model rather than once per gallery view.
+    """
+    from .preview import get_preview_path, write_preview
+    
+    filepath = get_artifact_path(model_id)
+    preview_path = get_preview_path(filepath)
+    exists = preview_path.exists()
+    metrics.inc('vision3d_cache_requests',
+                {'tier': 'preview', 'result': 'hit' if exists else 'miss'})
+    if not exists:
+        mesh = load_artifact(filepath)
+        with metrics.time_stage('preview'):
+            write_preview(mesh, filepath)
+    
+    headers, not_modified = get_artifact_cache_headers(request, model_id, preview_path)
+    if not_modified is not None:
+        return not_modified
+    response = FileResponse(open(preview_path, 'rb'),
+                            content_type=f'image/{preview_path.suffix[1:]}')
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def serve_artifact(request, path, document_root=None):
+    """Serve stored models and previews with long-lived immutable caching."""
+    response = serve(request, path, document_root=document_root)
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
 
 
 @api_view(['GET'])
 def health_check(request):
     """Simple health check endpoint."""
     return Response({'status': 'healthy', 'service': 'Vision3D API'})
+
+
+def metrics_view(request):
+    """Expose host-wide metrics in the OpenMetrics text format."""
+    return HttpResponse(
+        metrics.render_openmetrics(),
+        content_type='application/openmetrics-text; version=1.0.0; charset=utf-8'
+    )
@@ -0,0 +1,227 @@
+"""
+Fast approximate volume and support estimation for composite meshes.
+
+The composite generators join overlapping primitives with
+``trimesh.util.concatenate``, so ``mesh.volume`` counts every overlap twice.
+This module estimates the volume of the *union* instead, by casting a grid of
+vertical rays through the mesh and integrating the z-intervals where the
+winding number is positive. The same crossings give the overhangs of the
+union and the height of the support column under each of them.
+"""
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from . import metrics
+
+
+# Sub-cell offset applied to the ray grid so rays do not run exactly along
+# the shared edges of axis-aligned primitives.
+_GRID_JITTER = 0.00618034
+
+
+def get_volume_resolution() -> int:
+    """Return the configured number of ray columns along the widest axis."""
+    return int(getattr(settings, 'PRINT_VOLUME_RESOLUTION', 128))
+
+
+def get_support_resolution() -> int:
+    """Ray columns along the widest axis for support estimation."""
+    return int(getattr(settings, 'SUPPORT_RESOLUTION', 64))
+
+
+def _column_crossings(triangles: np.ndarray, resolution: int):
+    """
+    Intersect a grid of vertical rays with every triangle in one pass.
+
+    Returns None for empty or flat input, otherwise a dict with the crossing
+    heights ``z`` sorted by ``column`` then height, the winding change
+    ``delta`` of each crossing (+1 entering the solid going up), the unit
+    normal z of the crossed triangle ``normal_z``, the grid ``cell`` size
+    and the mesh ``lo``/``hi`` bounds.
+    """
+    if len(triangles) == 0:
+        return None
+
+    lo = triangles.reshape(-1, 3).min(axis=0)
+    hi = triangles.reshape(-1, 3).max(axis=0)
+    extent = hi - lo
+    cell = max(extent[0], extent[1]) / max(int(resolution), 1)
+    if cell <= 0 or extent[2] <= 0:
+        return None
+
+    nx = max(int(np.ceil(extent[0] / cell)), 1)
+    ny = max(int(np.ceil(extent[1] / cell)), 1)
+    offset = 0.5 + _GRID_JITTER
+
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+
+    # Twice the signed xy area; its sign is the sign of the face normal's z
+    det = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1])
+    keep = np.abs(det) > 1e-12
+    a, b, c, det = a[keep], b[keep], c[keep], det[keep]
+    if len(det) == 0:
+        return None
+    normal_z = det / np.linalg.norm(np.cross(b - a, c - a), axis=1)
+
+    # Range of ray columns covered by each triangle's xy bounding box
+    tri_min = np.minimum(np.minimum(a, b), c)
+    tri_max = np.maximum(np.maximum(a, b), c)
+    ix0 = np.clip(np.ceil((tri_min[:, 0] - lo[0]) / cell - offset), 0, nx - 1).astype(np.int64)
+    ix1 = np.clip(np.floor((tri_max[:, 0] - lo[0]) / cell - offset), -1, nx - 1).astype(np.int64)
+    iy0 = np.clip(np.ceil((tri_min[:, 1] - lo[1]) / cell - offset), 0, ny - 1).astype(np.int64)
+    iy1 = np.clip(np.floor((tri_max[:, 1] - lo[1]) / cell - offset), -1, ny - 1).astype(np.int64)
+    count_x = np.maximum(ix1 - ix0 + 1, 0)
+    count_y = np.maximum(iy1 - iy0 + 1, 0)
+    pairs = count_x * count_y
+    total = int(pairs.sum())
+    if total == 0:
+        return None
+
+    # Expand (triangle, column) candidate pairs without a Python loop
+    tri = np.repeat(np.arange(len(det)), pairs)
+    local = np.arange(total) - np.repeat(np.cumsum(pairs) - pairs, pairs)
+    ix = ix0[tri] + local % count_x[tri]
+    iy = iy0[tri] + local // count_x[tri]
+    px = lo[0] + (ix + offset) * cell
+    py = lo[1] + (iy + offset) * cell
+
+    ta, tb, tc, td = a[tri], b[tri], c[tri], det[tri]
+    l1 = ((tb[:, 1] - tc[:, 1]) * (px - tc[:, 0]) + (tc[:, 0] - tb[:, 0]) * (py - tc[:, 1])) / td
+    l2 = ((tc[:, 1] - ta[:, 1]) * (px - tc[:, 0]) + (ta[:, 0] - tc[:, 0]) * (py - tc[:, 1])) / td
+    l3 = 1.0 - l1 - l2
+    hit = (l1 >= 0) & (l2 >= 0) & (l3 >= 0)
+    if not np.any(hit):
+        return None
+
+    z = (l1 * ta[:, 2] + l2 * tb[:, 2] + l3 * tc[:, 2])[hit]
+    column = (iy * nx + ix)[hit]
+    # An upward ray enters through downward-facing triangles
+    delta = -np.sign(td[hit]).astype(np.int64)
+
+    # Entries sort before exits at the same height, so stacked parts that
+    # touch do not count as a gap
+    order = np.lexsort((-delta, z, column))
+    return {
+        'z': z[order],
+        'column': column[order],
+        'delta': delta[order],
+        'normal_z': normal_z[tri[hit][order]],
+        'cell': cell,
+        'lo': lo,
+        'hi': hi,
+    }
+
+
+def _winding(column: np.ndarray, delta: np.ndarray) -> np.ndarray:
+    """Winding number after each crossing, restarted at every column."""
+    running = np.cumsum(delta)
+    starts = np.flatnonzero(np.r_[True, column[1:] != column[:-1]])
+    lengths = np.diff(np.r_[starts, len(column)])
+    return running - np.repeat(running[starts] - delta[starts], lengths)
+
+
+def estimate_volume(mesh, resolution: int = None) -> float:
+    """
+    Estimate the enclosed volume of a (possibly self-overlapping) mesh.
+
+    Args:
+        mesh: Triangle mesh made of one or more closed, outward-facing parts
+        resolution: Number of ray columns along the widest horizontal axis
+
+    Returns:
+        Volume of the union of all parts, in mesh units cubed.
+
+    Runtime is bounded by ``resolution ** 2`` columns; each column is
+    integrated exactly in z, so the error is limited to the silhouette
+    cells (roughly projected perimeter x cell size x height).
+    """
+    if resolution is None:
+        resolution = get_volume_resolution()
+
+    crossings = _column_crossings(np.asarray(mesh.triangles, dtype=np.float64), resolution)
+    if crossings is None:
+        return 0.0
+    z, column = crossings['z'], crossings['column']
+    winding = _winding(column, crossings['delta'])
+
+    same_column = column[1:] == column[:-1]
+    inside = same_column & (winding[:-1] > 0)
+    covered = float(np.sum((z[1:] - z[:-1])[inside]))
+    return covered * float(crossings['cell']) ** 2
+
+
+def estimate_supports(mesh, resolution: int = None, overhang_angle: float = None) -> dict:
+    """
+    Estimate the support material a print of the mesh needs, as built.
+
+    Each ray column walks up through the union of all parts. Where it enters
+    the solid through a face tilted more than ``overhang_angle`` degrees from
+    vertical (the slicer convention: 0 supports every overhang, 90 only flat
+    ceilings), a support column is needed from that point down to the first
+    surface below it: the top of another part, or the build plate at the
+    mesh's lowest point.
+
+    Args:
+        mesh: Triangle mesh made of one or more closed, outward-facing parts
+        resolution: Number of ray columns along the widest horizontal axis
+        overhang_angle: Self-supporting limit in degrees
+
+    Returns:
+        Dict with the solid support ``volume`` (mesh units cubed), the
+        projected ``contact_area`` of supported overhangs (mesh units
+        squared) and the number of support ``columns``.
+    """
+    if resolution is None:
+        resolution = get_support_resolution()
+    if overhang_angle is None:
+        overhang_angle = float(getattr(settings, 'SUPPORT_OVERHANG_ANGLE', 45))
+
+    empty = {'volume': 0.0, 'contact_area': 0.0, 'columns': 0}
+    crossings = _column_crossings(np.asarray(mesh.triangles, dtype=np.float64), resolution)
+    if crossings is None:
+        return empty
+    z, column, delta = crossings['z'], crossings['column'], crossings['delta']
+    winding = _winding(column, delta)
+
+    # Lower surfaces of the union: the winding number leaves zero
+    before = winding - delta
+    entry = (delta > 0) & (before == 0)
+    steep = crossings['normal_z'] < -np.sin(np.radians(overhang_angle))
+
+    # Support rests on the previous crossing in the column (an exit from the
+    # union, since the winding is zero) or on the build plate
+    first = np.r_[True, column[1:] != column[:-1]]
+    floor = np.where(first, crossings['lo'][2], np.r_[0.0, z[:-1]])
+    height = z - floor
+    tolerance = 1e-6 * float(np.max(crossings['hi'] - crossings['lo']))
+    supported = entry & steep & (height > tolerance)
+
+    area = float(crossings['cell']) ** 2
+    return {
+        'volume': float(np.sum(height[supported])) * area,
+        'contact_area': int(np.count_nonzero(supported)) * area,
+        'columns': int(np.count_nonzero(supported)),
+    }
+
+
+def get_artifact_volume(mesh, artifact_key: str = None, resolution: int = None) -> float:
+    """
+    Return the estimated volume of a mesh, cached per artifact.
+
+    Artifacts are immutable for a given key, so the estimate is computed
+    once and shared by every later request for the same model.
+    """
+    if resolution is None:
+        resolution = get_volume_resolution()
+    if artifact_key is None:
+        return estimate_volume(mesh, resolution)
+
+    cache_key = f"volume_{artifact_key}_{resolution}"
+    volume = cache.get(cache_key)
+    metrics.inc('vision3d_cache_requests',
+                {'tier': 'volume', 'result': 'miss' if volume is None else 'hit'})
+    if volume is None:
+        volume = estimate_volume(mesh, resolution)
+        cache.set(cache_key, volume, timeout=settings.CACHE_TIMEOUT)
+    return volume
@@ -0,0 +1,59 @@
+"""
+Warm-up for serving processes.
+
+URL loading deliberately avoids importing trimesh and numpy, so management
+commands and tests start quickly. Serving processes call ``warm_up()`` once at
+startup (from the WSGI/ASGI entry points, or a server post-fork hook) so the
+first real request does not pay for imports, lazy trimesh internals, shape
+templates or worker pool start-up.
+"""
+
+import io
+import time
+from django.conf import settings
+
+
+_warmed_up = False
+
+
+def warm_up() -> float:
+    """
+    Preload heavy modules and exercise the generate/export/load path once.
+
+    Returns the time spent in seconds; later calls return 0.
+    """
+    global _warmed_up
+    if _warmed_up or not getattr(settings, 'GENERATOR_WARMUP', True):
+        return 0.0
+    _warmed_up = True
+    start = time.perf_counter()
+
+    import trimesh
+    from .backends import get_backend, get_worker_pool
+    from .encoding import encode_compact_glb
+    from .lsh import approximate_matching_enabled, minhash
+    from .preview import encode_preview, render_preview
+    from .shapes import SHAPE_BUILDERS, create_mesh_from_prompt, get_shape_template
+    from .views import calculate_print_parameters
+
+    for shape in SHAPE_BUILDERS:
+        get_shape_template(shape)
+
+    # One full pass through the keyword generator, encoder, loader, analysis and preview
+    mesh = create_mesh_from_prompt('warm up robot')
+    data = encode_compact_glb(mesh) or mesh.export(file_type='glb')
+    loaded = trimesh.load(io.BytesIO(data), file_type='glb', force='mesh')
+    calculate_print_parameters(loaded)
+    encode_preview(render_preview(loaded))
+    minhash('warm up robot')
+
+    # Start worker processes for isolated backends ahead of the first miss
+    backend_name = getattr(settings, 'GENERATOR_BACKEND', 'keyword')
+    if get_backend(backend_name).isolated and int(getattr(settings, 'GENERATOR_WORKERS', 2)) > 0:
+        get_worker_pool(backend_name)
+
+    if approximate_matching_enabled():
+        from .lsh import get_prompt_index
+        get_prompt_index()
+
+    return time.perf_counter() - start
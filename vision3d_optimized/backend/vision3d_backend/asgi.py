@@ -9,3 +9,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vision3d_backend.settings')
 
 application = get_asgi_application()
+
+# Preload generation dependencies now rather than on the first request
+from generator.warmup import warm_up  # noqa: E402
+warm_up()
@@ -4,6 +4,7 @@ Django settings for vision3d_backend project.
 
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -38,6 +39,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'generator.middleware.MetricsMiddleware',
 ]
 
 # CORS Configuration
@@ -136,3 +138,79 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.JSONParser',
     ],
 }
+
+# Ray columns along the widest axis for print volume estimation
+# (higher is more accurate; runtime grows with the square)
+PRINT_VOLUME_RESOLUTION = 128
+
+# GLB encoding: 'compact' stores single-color meshes with one material,
+# welded vertices and uint16 indices; 'trimesh' uses the stock exporter
+GLB_ENCODING = 'compact'
+
+# Generator backends: registry name ('keyword', 'slow_fake') or dotted class path
+GENERATOR_BACKEND = 'keyword'
+GENERATOR_FALLBACK_BACKEND = 'keyword'
+
+# Worker pool for isolated backends (per-job wall-clock and RSS limits)
+GENERATOR_WORKERS = 2
+GENERATOR_TIMEOUT = 60  # seconds
+GENERATOR_MAX_RSS_MB = 2048
+
+# Deterministic slow fake backend used for capacity testing
+GENERATOR_FAKE_DELAY = 2.0  # seconds
+GENERATOR_FAKE_MEMORY_MB = 0
+
+# Admission control for cache-miss generation (hits bypass it)
+GENERATION_MAX_CONCURRENT = 2
+GENERATION_MAX_QUEUE = 8
+GENERATION_QUEUE_TIMEOUT = 30  # seconds a miss may wait for a slot
+
+# Memory-mapped metric files shared by all worker processes on the host;
+# clear this directory on deploy
+METRICS_DIR = os.environ.get('VISION3D_METRICS_DIR',
+                             os.path.join(tempfile.gettempdir(), 'vision3d_metrics'))
+
+# Approximate prompt matching (MinHash LSH over prompt history); opt-in
+APPROXIMATE_PROMPT_MATCHING = False
+PROMPT_SIMILARITY_THRESHOLD = 0.8  # estimated Jaccard similarity of prompt shingles
+PROMPT_INDEX_PATH = BASE_DIR / 'prompt_index.npz'
+PROMPT_INDEX_SYNC_INTERVAL = 5  # seconds between catch-up reads of new history rows
+PROMPT_INDEX_SAVE_INTERVAL = 300  # seconds between background saves of new rows
+
+# Preload trimesh/numpy and exercise generation once when a server process starts
+GENERATOR_WARMUP = True
+
+# Preview thumbnails rendered on the CPU next to each artifact
+PREVIEW_FORMAT = 'webp'  # or 'png'
+PREVIEW_SIZE = 128  # pixels per side
+PREVIEW_PROJECTION = 'perspective'  # or 'orthographic'
+
+# Memory budget per worker job (RSS growth or traced peak); 0 disables the check.
+# Over-budget jobs are rerouted to GENERATOR_FALLBACK_BACKEND or aborted with a
+# 503. Worker jobs record traced peak and RSS delta. In-process stages (the
+# default keyword backend, GENERATOR_WORKERS = 0, every export) record RSS delta
+# only and have no cap unless MEMORY_TRACE_IN_PROCESS is on, which traces them
+# and checks in-process generation against the budget afterwards, at the cost
+# of slowing every request thread while a stage runs.
+GENERATION_MEMORY_BUDGET_MB = 1024
+GENERATION_MEMORY_POLICY = 'reroute'  # or 'abort'
+MEMORY_TRACE_IN_PROCESS = False
+
+# Cache lifetime of GET /api/models/<model id> results for browsers and proxies;
+# results requested by full prompt hash are always revalidated
+RESULT_CACHE_MAX_AGE = 7 * 24 * 3600
+
+# Reorder GLB triangles and vertices for the GPU vertex cache before export; the
+# triangle pass is pure Python, so it is skipped above GLB_OPTIMIZE_MAX_FACES
+GLB_OPTIMIZE_INDICES = True
+GLB_OPTIMIZE_MAX_FACES = 50000  # larger meshes only get the vertex reorder
+
+# Support estimation: ray columns along the widest axis, the steepest
+# self-supporting overhang (degrees from vertical) and the support lattice fill
+SUPPORT_RESOLUTION = 64
+SUPPORT_OVERHANG_ANGLE = 45
+SUPPORT_DENSITY = 0.15
+
+# Vertex normals in compact GLBs: 'int8' (KHR_mesh_quantization), 'float',
+# or 'none' to drop them and let viewers shade flat
+GLB_NORMALS = 'int8'
@@ -2,15 +2,19 @@
 URL configuration for vision3d_backend project.
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from generator.views import metrics_view, serve_artifact
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('generator.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
-# Serve media files in development
+# Serve media files in development (immutable, like the preview endpoint)
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += [
+        re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.*)$', serve_artifact,
+                {'document_root': settings.MEDIA_ROOT}),
+    ]
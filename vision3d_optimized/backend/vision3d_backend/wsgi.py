@@ -9,3 +9,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vision3d_backend.settings')
 
 application = get_wsgi_application()
+
+# Preload generation dependencies now rather than on the first request
+from generator.warmup import warm_up  # noqa: E402
+warm_up()
@@ -226,6 +226,9 @@ function App() {
                   <h4>Support Structures</h4>
                   <p><strong>Required:</strong> {printParams.supports_needed ? 'Yes' : 'No'}</p>
                   <p><strong>Type:</strong> {printParams.support_type}</p>
+                  {printParams.supports_needed && (
+                    <p><strong>Material:</strong> {printParams.support_weight_g}g ({printParams.support_volume_cm3} cm³ envelope)</p>
+                  )}
                 </div>
               </div>
 